@@ -8,23 +8,48 @@ runs speed tests when triggered, and sends heartbeats to a VPS monitor over Tail
 
 import csv
 import io
+import itertools
 import json
 import logging
 import os
+import re
+import select
+import selectors
 import signal
+import socket
+import struct
 import subprocess
 import sys
 import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
-from queue import Queue, Empty
 from typing import Optional
 
 import requests
+import urllib3
 import yaml
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
 
 
 def check_speedtest_cli() -> bool:
@@ -38,6 +63,45 @@ def check_speedtest_cli() -> bool:
 
 SPEEDTEST_AVAILABLE = check_speedtest_cli()
 
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _now_str(t: Optional[float] = None) -> str:
+    """Format a Unix timestamp (default: now) as a local datetime string."""
+    return time.strftime(DATETIME_FORMAT, time.localtime(t))
+
+
+def _json_default(obj):
+    """Encode datetimes as ISO 8601 strings, matching orjson's native handling."""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _json_bytes(obj) -> bytes:
+    """Serialize to compact JSON bytes, using orjson when it's installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), default=_json_default).encode()
+
+
+def _cbor_bytes(obj: dict) -> bytes:
+    """Serialize a payload to CBOR, sending datetimes as ISO strings like the JSON path."""
+    return cbor2.dumps({k: v.isoformat() if isinstance(v, datetime) else v for k, v in obj.items()})
+
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PAYLOAD = b'internet-monitor'
+ICMP_HEADER = struct.Struct('!BBHHH')
+
+# Summary line of the system ping command, e.g. "rtt min/avg/max/mdev = 9.1/10.2/11.3/0.4 ms"
+PING_RTT_RE = re.compile(rb'(?:rtt|round-trip)[^=]*=\s*[\d.]+/([\d.]+)/', re.IGNORECASE)
+
+# Outage reports per /outage/batch request, keeping each body well under the
+# VPS's batch size limit
+OUTAGE_BATCH_SIZE = 200
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -47,6 +111,31 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _split_csv(value: str) -> list:
+    """Split a comma-separated environment value."""
+    return value.split(',')
+
+
+# Environment variable -> (Config attribute, converter)
+_ENV_MAP = {
+    'PING_TARGETS': ('ping_targets', _split_csv),
+    'PING_INTERVAL': ('ping_interval_seconds', int),
+    'PING_TIMEOUT': ('ping_timeout_seconds', int),
+    'HEARTBEAT_INTERVAL': ('heartbeat_interval_seconds', int),
+    'VPS_URL': ('vps_url', str),
+    'LOG_DIRECTORY': ('log_directory', str),
+    'LOG_RETENTION_DAYS': ('log_retention_days', int),
+    'NTFY_SERVER_URL': ('ntfy_server_url', str),
+    'NTFY_TOPIC': ('ntfy_topic', str),
+    'HIGH_LATENCY_THRESHOLD': ('high_latency_threshold_ms', int),
+    'SLOW_SPEED_THRESHOLD': ('slow_speed_threshold_mbps', float),
+    'SCHEDULED_SPEED_TEST_INTERVAL': ('scheduled_speed_test_interval_seconds', int),
+    'OOKLA_SERVER_CACHE': ('ookla_server_cache_seconds', int),
+    'WIRE_FORMAT': ('wire_format', str),
+    'HTTP_PORT': ('http_port', int),
+}
+
+
 @dataclass
 class Config:
     """Configuration for the NAS monitor."""
@@ -65,6 +154,8 @@ class Config:
     slow_speed_threshold_mbps: float = 50.0  # Trigger frequent tests below this
     slow_speed_test_interval_seconds: int = 300  # 5 min when speed is slow
     scheduled_speed_test_interval_seconds: int = 3600  # Hourly speed test
+    ookla_server_cache_seconds: int = 21600  # Reuse the chosen Ookla server for 6h
+    wire_format: str = 'json'  # json or cbor for payloads sent to the VPS
     # HTTP server for manual triggers
     http_port: int = 8080
 
@@ -74,33 +165,20 @@ class Config:
         config = cls()
 
         # Load from YAML if exists
-        if os.path.exists(config_path):
+        try:
             with open(config_path, 'r') as f:
-                yaml_config = yaml.safe_load(f) or {}
-                for key, value in yaml_config.items():
-                    if hasattr(config, key):
-                        setattr(config, key, value)
-
-        # Override with environment variables
-        env_mappings = {
-            'PING_TARGETS': ('ping_targets', lambda x: x.split(',')),
-            'PING_INTERVAL': ('ping_interval_seconds', int),
-            'PING_TIMEOUT': ('ping_timeout_seconds', int),
-            'HEARTBEAT_INTERVAL': ('heartbeat_interval_seconds', int),
-            'VPS_URL': ('vps_url', str),
-            'LOG_DIRECTORY': ('log_directory', str),
-            'LOG_RETENTION_DAYS': ('log_retention_days', int),
-            'NTFY_SERVER_URL': ('ntfy_server_url', str),
-            'NTFY_TOPIC': ('ntfy_topic', str),
-            'HIGH_LATENCY_THRESHOLD': ('high_latency_threshold_ms', int),
-            'SLOW_SPEED_THRESHOLD': ('slow_speed_threshold_mbps', float),
-            'SCHEDULED_SPEED_TEST_INTERVAL': ('scheduled_speed_test_interval_seconds', int),
-            'HTTP_PORT': ('http_port', int),
-        }
-
-        for env_var, (attr, converter) in env_mappings.items():
-            value = os.environ.get(env_var)
+                yaml_config = yaml.load(f.read(), Loader=SafeLoader) or {}
+        except FileNotFoundError:
+            yaml_config = {}
+        for key, value in yaml_config.items():
+            if hasattr(config, key):
+                setattr(config, key, value)
+
+        # Override with environment variables, visiting only those that are set
+        overrides = {k: os.environ[k] for k in _ENV_MAP if k in os.environ}
+        for env_var, value in overrides.items():
             if value:
+                attr, converter = _ENV_MAP[env_var]
                 try:
                     setattr(config, attr, converter(value))
                 except (ValueError, TypeError) as e:
@@ -108,18 +186,33 @@ class Config:
 
         return config
 
+    @classmethod
+    def reload(cls, config_path: str, mtime: Optional[float]) -> Optional['Config']:
+        """Load configuration again if the file changed since mtime, else return None."""
+        try:
+            if os.stat(config_path).st_mtime == mtime:
+                return None
+        except FileNotFoundError:
+            if mtime is None:
+                return None
+        return cls.load(config_path)
 
-@dataclass
+
+@dataclass(slots=True)
 class PingResult:
     """Result of a ping operation."""
     timestamp: float
-    datetime_str: str
     status: str  # 'online' or 'outage'
     ping_ms: Optional[float]
     target: str
 
+    @property
+    def datetime_str(self) -> str:
+        """Local time of the check, formatted only when something logs it."""
+        return _now_str(self.timestamp)
 
-@dataclass
+
+@dataclass(slots=True)
 class SpeedTestResult:
     """Result of a speed test."""
     timestamp: float
@@ -131,8 +224,21 @@ class SpeedTestResult:
     upload_mbps: Optional[float] = None  # Only for Ookla tests
     test_type: str = 'vps'  # 'vps' or 'ookla'
 
+    def to_log_dict(self) -> dict:
+        """Build the event data logged locally and forwarded to the VPS."""
+        data = {
+            'timestamp': self.timestamp,
+            'datetime_str': self.datetime_str,
+            'speed_mbps': self.speed_mbps,
+            'trigger': self.trigger,
+            'test_type': self.test_type
+        }
+        if self.upload_mbps is not None:
+            data['upload_mbps'] = self.upload_mbps
+        return data
 
-@dataclass
+
+@dataclass(slots=True)
 class OutageEvent:
     """Represents a detected outage."""
     start_time: float
@@ -141,30 +247,146 @@ class OutageEvent:
     end_datetime: Optional[str] = None
     duration_seconds: Optional[float] = None
 
+    def to_payload(self) -> dict:
+        """Build the report body sent to the VPS."""
+        return {
+            'start_time': self.start_time,
+            'start_datetime': self.start_datetime,
+            'end_time': self.end_time,
+            'end_datetime': self.end_datetime,
+            'duration_seconds': self.duration_seconds,
+            'source': 'nas-monitor'
+        }
+
 
 class PingMonitor:
     """Handles ping operations to check internet connectivity."""
 
+    SUCCESS_GRACE_SECONDS = 0.2
+
     def __init__(self, config: Config):
         self.config = config
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = itertools.count(1)
+        # Only the sequence number changes between echo requests, so sum the
+        # fixed header words and payload once and fold in the sequence per packet
+        self._checksum_base = self._ones_complement_sum(
+            struct.pack('!BBHH', ICMP_ECHO_REQUEST, 0, 0, self._ident) + ICMP_PAYLOAD)
+        self._ping_timeout_total = config.ping_timeout_seconds * config.ping_count + 5
+        self._sock_type = self._probe_socket_type()
+        self._raw = self._sock_type == socket.SOCK_RAW
+        if self._sock_type is None:
+            logger.warning("Cannot open ICMP socket (check net.ipv4.ping_group_range or CAP_NET_RAW); "
+                           "falling back to the ping command")
+            self._cmd_prefix = self._ping_command_prefix(config)
+        # Pings run concurrently, so each worker thread gets its own socket
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=len(config.ping_targets), thread_name_prefix='ping')
+
+    @staticmethod
+    def _probe_socket_type() -> Optional[int]:
+        """Find the ICMP socket type we may open, preferring unprivileged datagram over raw."""
+        for sock_type in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP).close()
+                return sock_type
+            except OSError:
+                continue
+        return None
+
+    def _get_socket(self) -> socket.socket:
+        """Return this thread's ICMP socket, opening it on first use."""
+        if not hasattr(self._local, 'sock'):
+            self._local.sock = socket.socket(socket.AF_INET, self._sock_type, socket.IPPROTO_ICMP)
+        return self._local.sock
+
+    @staticmethod
+    def _ones_complement_sum(data: bytes) -> int:
+        """Sum the 16-bit big-endian words of data (unfolded)."""
+        if len(data) % 2:
+            data += b'\x00'
+        total = 0
+        for i in range(0, len(data), 2):
+            total += (data[i] << 8) + data[i + 1]
+        return total
+
+    def _build_packet(self, seq: int) -> bytes:
+        """Build an ICMP echo request with the given sequence number."""
+        total = self._checksum_base + seq
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        checksum = ~total & 0xFFFF
+        return ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum, self._ident, seq) + ICMP_PAYLOAD
+
+    def _echo_batch(self, sock: socket.socket, addr: str, count: int) -> list[float]:
+        """Send count echo requests back-to-back and collect the replies. Returns RTTs in ms."""
+        pending = {}
+        for _ in range(count):
+            seq = next(self._seq) & 0xFFFF
+            pending[seq] = time.perf_counter()
+            sock.sendto(self._build_packet(seq), (addr, 0))
+        deadline = time.perf_counter() + self.config.ping_timeout_seconds
+
+        rtts = []
+        while pending:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([sock], [], [], remaining)
+            if not ready:
+                break
+            data, (src, _) = sock.recvfrom(1024)
+            received = time.perf_counter()
+            if self._raw:
+                # Raw sockets include the IP header; datagram sockets don't
+                data = data[(data[0] & 0x0F) * 4:]
+            if src != addr or len(data) < 8:
+                continue
+            icmp_type, _, _, ident, reply_seq = ICMP_HEADER.unpack_from(data)
+            # Datagram sockets rewrite the identifier, so only check it for raw
+            if icmp_type != ICMP_ECHO_REPLY or reply_seq not in pending:
+                continue
+            if self._raw and ident != self._ident:
+                continue
+            rtts.append((received - pending.pop(reply_seq)) * 1000)
+        return rtts
 
     def ping(self, target: str) -> tuple[bool, Optional[float]]:
         """Ping a target and return (success, latency_ms)."""
+        if self._sock_type is None:
+            return self._ping_command(target)
+
         try:
-            if sys.platform == 'darwin':  # macOS
-                cmd = ['ping', '-c', str(self.config.ping_count), '-t',
-                       str(self.config.ping_timeout_seconds), target]
-            elif sys.platform == 'win32':
-                cmd = ['ping', '-n', str(self.config.ping_count), '-w',
-                       str(self.config.ping_timeout_seconds * 1000), target]
-            else:  # Linux
-                cmd = ['ping', '-c', str(self.config.ping_count), '-W',
-                       str(self.config.ping_timeout_seconds), target]
+            sock = self._get_socket()
+            addr = socket.gethostbyname(target)
+            rtts = self._echo_batch(sock, addr, self.config.ping_count)
 
-            result = subprocess.run(
-                cmd, capture_output=True, text=True,
-                timeout=self.config.ping_timeout_seconds * self.config.ping_count + 5
-            )
+            if rtts:
+                return True, sum(rtts) / len(rtts)
+            return False, None
+
+        except OSError:
+            # Unreachable network or failed DNS lookup during an outage
+            return False, None
+        except Exception as e:
+            logger.error(f"Ping error for {target}: {e}")
+            return False, None
+
+    @staticmethod
+    def _ping_command_prefix(config: Config) -> tuple:
+        """Build the platform's ping command line, minus the target."""
+        if sys.platform == 'darwin':  # macOS
+            return ('ping', '-c', str(config.ping_count), '-t', str(config.ping_timeout_seconds))
+        if sys.platform == 'win32':
+            return ('ping', '-n', str(config.ping_count), '-w', str(config.ping_timeout_seconds * 1000))
+        # Linux
+        return ('ping', '-c', str(config.ping_count), '-W', str(config.ping_timeout_seconds))
+
+    def _ping_command(self, target: str) -> tuple[bool, Optional[float]]:
+        """Ping a target with the system ping command when ICMP sockets are unavailable."""
+        try:
+            result = subprocess.run((*self._cmd_prefix, target), capture_output=True,
+                                    timeout=self._ping_timeout_total)
 
             if result.returncode == 0:
                 latency = self._parse_ping_latency(result.stdout)
@@ -177,74 +399,90 @@ class PingMonitor:
             logger.error(f"Ping error for {target}: {e}")
             return False, None
 
-    def _parse_ping_latency(self, output: str) -> Optional[float]:
+    def _parse_ping_latency(self, output: bytes) -> Optional[float]:
         """Extract average latency from ping output."""
-        try:
-            for line in output.split('\n'):
-                if 'avg' in line.lower() or 'average' in line.lower():
-                    if '=' in line:
-                        numbers_part = line.split('=')[1].strip()
-                        parts = numbers_part.split('/')
-                        if len(parts) >= 2:
-                            return float(parts[1])
-            return None
-        except (ValueError, IndexError):
-            return None
+        match = PING_RTT_RE.search(output)
+        return float(match.group(1)) if match else None
 
     def check_connectivity(self) -> PingResult:
-        """Check internet connectivity by pinging targets."""
+        """Check internet connectivity by pinging all targets concurrently."""
         timestamp = time.time()
-        datetime_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         best_latency = None
         any_success = False
         successful_target = None
 
-        for target in self.config.ping_targets:
-            success, latency = self.ping(target)
-            if success:
-                any_success = True
-                successful_target = target
-                if latency is not None:
-                    if best_latency is None or latency < best_latency:
+        futures = {self._pool.submit(self.ping, target): target for target in self.config.ping_targets}
+        pending = set(futures)
+        deadline = time.monotonic() + self._ping_timeout_total
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    success, latency = future.result()
+                    if not success:
+                        continue
+                    if not any_success:
+                        # Give slower targets a moment to report a lower latency
+                        any_success = True
+                        deadline = min(deadline, time.monotonic() + self.SUCCESS_GRACE_SECONDS)
+                    if successful_target is None or (
+                            latency is not None and (best_latency is None or latency < best_latency)):
+                        successful_target = futures[future]
                         best_latency = latency
-                break
+        finally:
+            for future in pending:
+                future.cancel()
 
         return PingResult(
             timestamp=timestamp,
-            datetime_str=datetime_str,
             status='online' if any_success else 'outage',
             ping_ms=best_latency,
             target=successful_target or self.config.ping_targets[0]
         )
 
+    def close(self):
+        """Stop the ping worker threads."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
 
 class SpeedTester:
     """Handles speed tests by downloading file from VPS or using Ookla."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, session: requests.Session):
         self.config = config
-        self.session = requests.Session()
+        self.session = session
+        self._buffer = bytearray(1 << 20)
+        # Ookla server picked by the last full server selection
+        self._ookla_server_id: Optional[int] = None
+        self._ookla_server_time = float('-inf')
 
     def run_test(self, trigger: str = 'manual') -> Optional[SpeedTestResult]:
         """Run a speed test by downloading file from VPS."""
         url = f"{self.config.vps_url}/speedtest"
         timestamp = time.time()
-        datetime_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        datetime_str = _now_str(timestamp)
 
         try:
-            start_time = time.time()
-            response = self.session.get(url, timeout=60, stream=True)
+            start_time = time.perf_counter()
+            response = self.session.get(url, timeout=60, stream=True, headers={'Accept-Encoding': 'identity'})
 
             if response.status_code != 200:
                 logger.error(f"Speed test failed: HTTP {response.status_code}")
+                response.close()
                 return None
 
-            # Download and measure
+            # Download and measure, discarding the payload into a reused buffer
             total_bytes = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                total_bytes += len(chunk)
+            while True:
+                n = response.raw.readinto(self._buffer)
+                if not n:
+                    break
+                total_bytes += n
 
-            end_time = time.time()
+            end_time = time.perf_counter()
             duration = end_time - start_time
 
             if duration > 0:
@@ -265,7 +503,8 @@ class SpeedTester:
             logger.info(f"Speed test (VPS): {speed_mbps:.1f} Mbps ({trigger})")
             return result
 
-        except requests.RequestException as e:
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            # Reading response.raw directly raises urllib3 errors unwrapped
             logger.error(f"Speed test failed: {e}")
             return None
 
@@ -276,29 +515,41 @@ class SpeedTester:
             return None
 
         timestamp = time.time()
-        datetime_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        datetime_str = _now_str(timestamp)
 
         try:
             logger.info("Running Ookla speed test (this may take 30-60 seconds)...")
-            start_time = time.time()
+            start_time = time.monotonic()
+
+            # Run official Ookla CLI with JSON output, skipping server
+            # selection while the previously chosen server is still fresh
+            cmd = ['speedtest', '--accept-license', '--accept-gdpr', '--format=json']
+            pinned = (self._ookla_server_id is not None and
+                      start_time - self._ookla_server_time < self.config.ookla_server_cache_seconds)
+            if pinned:
+                cmd.append(f'--server-id={self._ookla_server_id}')
 
-            # Run official Ookla CLI with JSON output
             result = subprocess.run(
-                ['speedtest', '--accept-license', '--accept-gdpr', '--format=json'],
+                cmd,
                 capture_output=True,
                 text=True,
                 timeout=120
             )
 
-            end_time = time.time()
+            end_time = time.monotonic()
             duration = end_time - start_time
 
             if result.returncode != 0:
                 logger.error(f"Ookla CLI failed: {result.stderr}")
+                # The pinned server may have gone away; reselect next time
+                self._ookla_server_id = None
                 return None
 
             # Parse JSON output
             data = json.loads(result.stdout)
+            if not pinned:
+                self._ookla_server_id = data.get('server', {}).get('id')
+                self._ookla_server_time = start_time
 
             # Bandwidth is in bytes per second, convert to Mbps
             download_speed = (data['download']['bandwidth'] * 8) / 1_000_000
@@ -332,11 +583,22 @@ class SpeedTester:
 class EventLogger:
     """Logs events (status changes, speed tests, anomalies) to CSV."""
 
+    # Pending rows are written once either threshold is reached
+    FLUSH_ROW_COUNT = 32
+    FLUSH_INTERVAL_SECONDS = 60.0
+
     def __init__(self, config: Config):
         self.config = config
         self.log_dir = Path(config.log_directory)
         self._ensure_log_directory()
         self._last_cleanup_date: Optional[str] = None
+        self._lock = threading.Lock()
+        self._fh: Optional[io.TextIOWrapper] = None
+        self._fh_date: Optional[str] = None
+        self._pending: list[str] = []
+        self._last_flush = time.monotonic()
+        self._row_buffer = io.StringIO()
+        self._row_writer = csv.writer(self._row_buffer)
 
     def _ensure_log_directory(self):
         """Create log directory if it doesn't exist."""
@@ -348,7 +610,7 @@ class EventLogger:
 
     def _cleanup_old_logs(self):
         """Delete log files older than retention period."""
-        today = datetime.now().strftime('%Y-%m-%d')
+        today = time.strftime('%Y-%m-%d')
         if self._last_cleanup_date == today:
             return
 
@@ -356,62 +618,118 @@ class EventLogger:
         cutoff_date = datetime.now() - timedelta(days=self.config.log_retention_days)
 
         try:
-            for log_file in self.log_dir.glob('*.csv'):
-                try:
-                    file_date = datetime.strptime(log_file.stem, '%Y-%m-%d')
-                    if file_date < cutoff_date:
-                        log_file.unlink()
-                        logger.info(f"Deleted old log: {log_file.name}")
-                except (ValueError, OSError):
-                    continue
+            with os.scandir(self.log_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.endswith('.csv'):
+                        continue
+                    try:
+                        file_date = datetime.strptime(name[:-4], '%Y-%m-%d')
+                        if file_date < cutoff_date:
+                            os.unlink(entry.path)
+                            logger.info(f"Deleted old log: {name}")
+                    except (ValueError, OSError):
+                        continue
         except OSError as e:
             logger.warning(f"Error during log cleanup: {e}")
 
-    def _get_log_filename(self) -> Path:
-        """Get the log filename for the current date."""
-        date_str = datetime.now().strftime('%Y-%m-%d')
+    def _get_log_filename(self, date_str: str) -> Path:
+        """Get the log filename for the given date."""
         return self.log_dir / f"{date_str}.csv"
 
+    def _format_row(self, row: list) -> str:
+        """Format a row as a CSV line."""
+        self._row_buffer.seek(0)
+        self._row_buffer.truncate()
+        self._row_writer.writerow(row)
+        return self._row_buffer.getvalue()
+
+    def _open_log_file(self, date_str: str):
+        """Switch the open log file to the given date, writing a header if it's new."""
+        self._flush()
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+        self._fh = open(self._get_log_filename(date_str), 'a', newline='', buffering=65536)
+        self._fh_date = date_str
+        # Append mode starts at the end, so position 0 means the file is new
+        if self._fh.tell() == 0:
+            self._pending.append(self._format_row(['timestamp', 'datetime', 'event_type', 'details']))
+
+    def _flush(self):
+        """Write pending rows to the open log file."""
+        rows, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        if rows and self._fh:
+            self._fh.writelines(rows)
+            self._fh.flush()
+
     def log_event(self, event_type: str, data: dict):
         """Log an event to the CSV file."""
-        self._cleanup_old_logs()
-        log_file = self._get_log_filename()
-        file_exists = log_file.exists()
+        timestamp = data.get('timestamp', time.time())
+        datetime_str = data.get('datetime_str') or _now_str(timestamp)
+        details = {k: v for k, v in data.items() if k not in ['timestamp', 'datetime_str']}
 
-        try:
-            with open(log_file, 'a', newline='') as f:
-                writer = csv.writer(f)
-                if not file_exists:
-                    writer.writerow(['timestamp', 'datetime', 'event_type', 'details'])
-
-                timestamp = data.get('timestamp', time.time())
-                datetime_str = data.get('datetime_str', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                details = {k: v for k, v in data.items() if k not in ['timestamp', 'datetime_str']}
+        with self._lock:
+            self._cleanup_old_logs()
+            try:
+                today = time.strftime('%Y-%m-%d')
+                if self._fh is None or self._fh_date != today:
+                    self._open_log_file(today)
+
+                self._pending.append(self._format_row([timestamp, datetime_str, event_type, _json_bytes(details).decode()]))
+                if (len(self._pending) >= self.FLUSH_ROW_COUNT or
+                        time.monotonic() - self._last_flush > self.FLUSH_INTERVAL_SECONDS):
+                    self._flush()
+            except OSError as e:
+                logger.error(f"Failed to write to log file: {e}")
+
+    def flush_if_due(self):
+        """Write pending rows if they have been waiting longer than the flush interval."""
+        if time.monotonic() - self._last_flush > self.FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """Write any pending rows to disk."""
+        with self._lock:
+            try:
+                self._flush()
+            except OSError as e:
+                logger.error(f"Failed to write to log file: {e}")
 
-                writer.writerow([timestamp, datetime_str, event_type, str(details)])
-        except OSError as e:
-            logger.error(f"Failed to write to log file: {e}")
+    def close(self):
+        """Flush pending rows and close the log file."""
+        with self._lock:
+            try:
+                self._flush()
+                if self._fh:
+                    self._fh.close()
+            except OSError as e:
+                logger.error(f"Failed to close log file: {e}")
+            self._fh = None
+            self._fh_date = None
 
 
 class NtfyNotifier:
     """Sends notifications via ntfy."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, session: requests.Session):
         self.config = config
-        self.session = requests.Session()
+        self.session = session
+        self._url = f"{config.ntfy_server_url}/{config.ntfy_topic}" if config.ntfy_topic else None
 
     def send(self, title: str, message: str, priority: str = 'default', tags: list = None) -> bool:
         """Send a notification to ntfy."""
-        if not self.config.ntfy_topic:
+        if not self._url:
             return False
 
         try:
-            url = f"{self.config.ntfy_server_url}/{self.config.ntfy_topic}"
             headers = {'Title': title, 'Priority': priority}
             if tags:
                 headers['Tags'] = ','.join(tags)
 
-            response = self.session.post(url, data=message.encode('utf-8'), headers=headers, timeout=10)
+            response = self.session.post(self._url, data=message.encode('utf-8'), headers=headers, timeout=10)
             return response.status_code == 200
         except requests.RequestException as e:
             logger.error(f"Failed to send notification: {e}")
@@ -439,9 +757,31 @@ class NtfyNotifier:
 class VPSClient:
     """Handles communication with the VPS monitor."""
 
+    JSON_HEADERS = {'Content-Type': 'application/json'}
+    CBOR_HEADERS = {'Content-Type': 'application/cbor'}
+
     def __init__(self, config: Config):
         self.config = config
-        self.session = requests.Session()
+        # A bare keep-alive pool skips the per-request overhead of requests.Session;
+        # one connection each for the heartbeat thread, the monitor loop and
+        # speed test result posts, so none is discarded when all three overlap
+        self.pool = urllib3.connection_from_url(config.vps_url, maxsize=3, timeout=10, retries=False)
+        self._encode, self._headers = _json_bytes, self.JSON_HEADERS
+        if config.wire_format == 'cbor':
+            if cbor2 is not None:
+                self._encode, self._headers = _cbor_bytes, self.CBOR_HEADERS
+            else:
+                logger.warning("wire_format is cbor but cbor2 is not installed, sending JSON")
+        base_path = (urllib3.util.parse_url(config.vps_url).path or '').rstrip('/')
+        self._heartbeat_path = f"{base_path}/heartbeat"
+        self._outage_path = f"{base_path}/outage"
+        self._outage_batch_path = f"{base_path}/outage/batch"
+        self._events_path = f"{base_path}/api/events"
+        # The boot ID is fixed for the life of this process
+        self._boot_id = self._get_boot_id()
+        # Only the time fields and uptime change between JSON heartbeats, so
+        # serialize the rest once and splice the changing values in per send
+        self._hb_prefix = _json_bytes({'source': 'nas-monitor', 'boot_id': self._boot_id})[:-1] + b',"timestamp":'
 
     def _get_boot_id(self) -> str:
         """Get the Linux boot ID (changes on every reboot)."""
@@ -459,57 +799,52 @@ class VPSClient:
         except Exception:
             return 0.0
 
-    def send_heartbeat(self) -> bool:
-        """Send a heartbeat to the VPS."""
+    def _post_body(self, path: str, body: bytes) -> bool:
+        """POST an already-encoded body to a VPS path. Returns True if accepted."""
         try:
-            response = self.session.post(
-                f"{self.config.vps_url}/heartbeat",
-                json={
-                    'timestamp': time.time(),
-                    'datetime': datetime.now().isoformat(),
-                    'source': 'nas-monitor',
-                    'boot_id': self._get_boot_id(),
-                    'uptime_seconds': self._get_uptime_seconds(),
-                },
-                timeout=10
-            )
-            return response.status_code == 200
-        except requests.RequestException:
+            response = self.pool.urlopen('POST', path, body=body, headers=self._headers)
+            return response.status == 200
+        except urllib3.exceptions.HTTPError:
             return False
 
+    def _post(self, path: str, payload: dict) -> bool:
+        """POST a payload to a VPS path in the configured wire format. Returns True if accepted."""
+        return self._post_body(path, self._encode(payload))
+
+    def send_heartbeat(self) -> bool:
+        """Send a heartbeat to the VPS."""
+        now = time.time()
+        uptime = self._get_uptime_seconds()
+        if self._encode is _json_bytes:
+            return self._post_body(self._heartbeat_path, b''.join((
+                self._hb_prefix, repr(now).encode(),
+                b',"datetime":"', datetime.fromtimestamp(now).isoformat().encode(),
+                b'","uptime_seconds":', repr(uptime).encode(), b'}',
+            )))
+        return self._post(self._heartbeat_path, {
+            'timestamp': now,
+            'datetime': datetime.fromtimestamp(now),
+            'source': 'nas-monitor',
+            'boot_id': self._boot_id,
+            'uptime_seconds': uptime,
+        })
+
     def send_outage_report(self, outage: OutageEvent) -> bool:
         """Send an outage report to the VPS."""
-        try:
-            response = self.session.post(
-                f"{self.config.vps_url}/outage",
-                json={
-                    'start_time': outage.start_time,
-                    'start_datetime': outage.start_datetime,
-                    'end_time': outage.end_time,
-                    'end_datetime': outage.end_datetime,
-                    'duration_seconds': outage.duration_seconds,
-                    'source': 'nas-monitor'
-                },
-                timeout=10
-            )
-            return response.status_code == 200
-        except requests.RequestException:
-            return False
+        return self._post(self._outage_path, outage.to_payload())
+
+    def send_outage_batch(self, outages: list[OutageEvent]) -> bool:
+        """Send several outage reports to the VPS in one request."""
+        return self._post(self._outage_batch_path, {
+            'outages': [outage.to_payload() for outage in outages]
+        })
 
     def send_event(self, event_type: str, data: dict) -> bool:
         """Send an event to the VPS for dashboard history."""
-        try:
-            response = self.session.post(
-                f"{self.config.vps_url}/api/events",
-                json={
-                    'event_type': event_type,
-                    'data': data
-                },
-                timeout=10
-            )
-            return response.status_code == 200
-        except requests.RequestException:
-            return False
+        return self._post(self._events_path, {
+            'event_type': event_type,
+            'data': data
+        })
 
 
 class InternetMonitor:
@@ -517,23 +852,45 @@ class InternetMonitor:
 
     def __init__(self, config: Config):
         self.config = config
+
+        # One pooled session shared by the speed tester and ntfy notifier
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                              max_retries=Retry(total=2, backoff_factor=0.2))
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+        # No retries for the speed test download: a retried request would be
+        # timed from the first attempt and report a bogus low speed
+        self._http.mount(f"{config.vps_url}/speedtest", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
         self.ping_monitor = PingMonitor(config)
-        self.speed_tester = SpeedTester(config)
+        self.speed_tester = SpeedTester(config, self._http)
         self.event_logger = EventLogger(config)
-        self.notifier = NtfyNotifier(config)
+        self.notifier = NtfyNotifier(config, self._http)
         self.vps_client = VPSClient(config)
 
         self.running = False
         self.current_outage: Optional[OutageEvent] = None
-        self.pending_outages: Queue[OutageEvent] = Queue()
-        self.last_heartbeat_time = 0
+        # Filled by the monitor loop, drained by the heartbeat thread; deque
+        # append/popleft are atomic so no extra locking is needed
+        self.pending_outages: deque[OutageEvent] = deque()
         self.last_status = 'online'
-        self.last_speed_test_time = 0
-        self.last_scheduled_test_time = 0
+        # Scheduling uses time.monotonic() so clock steps can't skip or
+        # repeat work; -inf means "never", so the first check always runs
+        self.last_speed_test_time = float('-inf')
+        self.last_speed_test_timestamp = 0.0  # Wall clock, for /status
+        self.last_scheduled_test_time = float('-inf')
+        self.next_status_log_time = float('-inf')
         self.in_slow_speed_mode = False
         self.speed_test_requested = threading.Event()
 
-        self._shutdown_event = threading.Event()
+        # stop() and signal.set_wakeup_fd() write to this pipe; it is never
+        # drained, so once stopping every waiting loop wakes immediately
+        self._wakeup_r, self.wakeup_fd = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self.wakeup_fd, False)
+        # Manual speed tests run one at a time so they don't skew each other
+        self._speedtest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='speedtest')
 
     def _log_and_forward(self, event_type: str, data: dict):
         """Log event locally and forward to VPS for dashboard."""
@@ -548,16 +905,7 @@ class InternetMonitor:
             result = self.speed_tester.run_test(trigger='manual')
 
         if result:
-            log_data = {
-                'timestamp': result.timestamp,
-                'datetime_str': result.datetime_str,
-                'speed_mbps': result.speed_mbps,
-                'trigger': result.trigger,
-                'test_type': result.test_type
-            }
-            if result.upload_mbps is not None:
-                log_data['upload_mbps'] = result.upload_mbps
-            self._log_and_forward('speed_test', log_data)
+            self._log_and_forward('speed_test', result.to_log_dict())
             self.notifier.notify_speed_test(result)
             self._check_slow_speed(result)
         return result
@@ -571,27 +919,14 @@ class InternetMonitor:
         vps_result = self.speed_tester.run_test(trigger='manual_full')
         if vps_result:
             results['vps_download_mbps'] = vps_result.speed_mbps
-            self._log_and_forward('speed_test', {
-                'timestamp': vps_result.timestamp,
-                'datetime_str': vps_result.datetime_str,
-                'speed_mbps': vps_result.speed_mbps,
-                'trigger': 'manual_full',
-                'test_type': 'vps'
-            })
+            self._log_and_forward('speed_test', vps_result.to_log_dict())
 
         # Run Ookla test (download + upload)
         ookla_result = self.speed_tester.run_ookla_test(trigger='manual_full')
         if ookla_result:
             results['ookla_download_mbps'] = ookla_result.speed_mbps
             results['ookla_upload_mbps'] = ookla_result.upload_mbps
-            self._log_and_forward('speed_test', {
-                'timestamp': ookla_result.timestamp,
-                'datetime_str': ookla_result.datetime_str,
-                'speed_mbps': ookla_result.speed_mbps,
-                'upload_mbps': ookla_result.upload_mbps,
-                'trigger': 'manual_full',
-                'test_type': 'ookla'
-            })
+            self._log_and_forward('speed_test', ookla_result.to_log_dict())
 
         # Send combined notification
         if results:
@@ -649,7 +984,8 @@ class InternetMonitor:
         if not result:
             return None
 
-        self.last_speed_test_time = time.time()
+        self.last_speed_test_time = time.monotonic()
+        self.last_speed_test_timestamp = result.timestamp
         vps_speed = result.speed_mbps
         is_slow = vps_speed < self.config.slow_speed_threshold_mbps
 
@@ -688,17 +1024,12 @@ class InternetMonitor:
 
         # Normal path: VPS test was fine, or Ookla not available
         if not only_log_if_slow or is_slow:
-            self._log_and_forward('speed_test', {
-                'timestamp': result.timestamp,
-                'datetime_str': result.datetime_str,
-                'speed_mbps': result.speed_mbps,
-                'trigger': result.trigger
-            })
+            self._log_and_forward('speed_test', result.to_log_dict())
             # Only notify for manual tests or when slow (not for routine scheduled tests)
             if trigger == 'manual' or is_slow:
                 self.notifier.notify_speed_test(result)
         else:
-            logger.debug(f"Scheduled speed test: {result.speed_mbps:.1f} Mbps (OK, not logged)")
+            logger.debug("Scheduled speed test: %.1f Mbps (OK, not logged)", result.speed_mbps)
 
         self._check_slow_speed(result)
         return result
@@ -715,6 +1046,7 @@ class InternetMonitor:
                 'timestamp': result.timestamp,
                 'datetime_str': result.datetime_str
             })
+            self.event_logger.flush()
             status_changed = True
 
         elif result.status == 'online' and self.last_status == 'outage':
@@ -730,7 +1062,8 @@ class InternetMonitor:
                     'datetime_str': result.datetime_str,
                     'duration_seconds': self.current_outage.duration_seconds
                 })
-                self.pending_outages.put(self.current_outage)
+                self.event_logger.flush()
+                self.pending_outages.append(self.current_outage)
                 self.current_outage = None
                 # Run speed test after outage
                 self._maybe_run_speed_test('post_outage')
@@ -740,27 +1073,44 @@ class InternetMonitor:
         return status_changed
 
     def _send_pending_outages(self):
-        """Send any pending outage reports to the VPS."""
-        while not self.pending_outages.empty():
-            try:
-                outage = self.pending_outages.get_nowait()
-                if self.vps_client.send_outage_report(outage):
-                    logger.info("Outage report sent to VPS")
-                else:
-                    self.pending_outages.put(outage)
+        """Send any pending outage reports to the VPS, a batch at a time."""
+        sent = 0
+        while self.pending_outages:
+            outages = []
+            while len(outages) < OUTAGE_BATCH_SIZE:
+                try:
+                    outages.append(self.pending_outages.popleft())
+                except IndexError:
                     break
-            except Empty:
+            if not self.vps_client.send_outage_batch(outages):
+                # Requeue this batch in order; later ones are still queued
+                self.pending_outages.extendleft(reversed(outages))
                 break
-
-    def _maybe_send_heartbeat(self):
-        """Send heartbeat if enough time has passed and we're online."""
-        current_time = time.time()
-        if (self.last_status == 'online' and
-            current_time - self.last_heartbeat_time >= self.config.heartbeat_interval_seconds):
-            if self.vps_client.send_heartbeat():
+            sent += len(outages)
+        if sent:
+            logger.info(f"Sent {sent} outage report(s) to VPS")
+
+    def _shutdown_selector(self) -> selectors.BaseSelector:
+        """Create a selector that becomes ready once the monitor is stopping."""
+        selector = selectors.DefaultSelector()
+        selector.register(self._wakeup_r, selectors.EVENT_READ)
+        return selector
+
+    def _heartbeat_loop(self):
+        """Send heartbeats on their own schedule so slow pings can't delay them."""
+        retry_interval = min(self.config.ping_interval_seconds, self.config.heartbeat_interval_seconds)
+        selector = self._shutdown_selector()
+        while self.running:
+            if self.last_status == 'online' and self.vps_client.send_heartbeat():
                 logger.debug("Heartbeat sent to VPS")
-                self.last_heartbeat_time = current_time
                 self._send_pending_outages()
+                wait_seconds = self.config.heartbeat_interval_seconds
+            else:
+                # Offline or VPS unreachable: try again after one ping interval
+                wait_seconds = retry_interval
+            if selector.select(wait_seconds):
+                break
+        selector.close()
 
     def run(self):
         """Main monitoring loop."""
@@ -774,9 +1124,12 @@ class InternetMonitor:
         logger.info(f"Scheduled speed test: every {self.config.scheduled_speed_test_interval_seconds}s (always logged)")
         logger.info(f"HTTP server port: {self.config.http_port}")
 
-        self._maybe_send_heartbeat()
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True, name='heartbeat')
+        heartbeat_thread.start()
 
-        while self.running and not self._shutdown_event.is_set():
+        selector = self._shutdown_selector()
+        while self.running:
+            loop_start = time.monotonic()
             try:
                 # Check for manual speed test request
                 if self.speed_test_requested.is_set():
@@ -801,14 +1154,14 @@ class InternetMonitor:
 
                 # Check if we need frequent speed tests (slow speed mode)
                 if self.in_slow_speed_mode:
-                    time_since_test = time.time() - self.last_speed_test_time
+                    time_since_test = time.monotonic() - self.last_speed_test_time
                     if time_since_test >= self.config.slow_speed_test_interval_seconds:
                         self._maybe_run_speed_test('slow_speed_retest')
 
                 # Scheduled hourly speed test (always log to dashboard, notify only if slow)
-                time_since_scheduled = time.time() - self.last_scheduled_test_time
+                time_since_scheduled = time.monotonic() - self.last_scheduled_test_time
                 if time_since_scheduled >= self.config.scheduled_speed_test_interval_seconds:
-                    self.last_scheduled_test_time = time.time()
+                    self.last_scheduled_test_time = time.monotonic()
                     # Log hourly latency sample for dashboard graph
                     if result.status == 'online' and result.ping_ms:
                         self._log_and_forward('latency', {
@@ -821,97 +1174,115 @@ class InternetMonitor:
 
                 # Log status (only on change or hourly)
                 if status_changed:
-                    if result.status == 'online':
-                        logger.info(f"Status: ONLINE | Ping: {result.ping_ms:.1f}ms" if result.ping_ms else "Status: ONLINE")
+                    if result.status == 'online' and result.ping_ms:
+                        logger.info("Status: ONLINE | Ping: %.1fms", result.ping_ms)
+                    elif result.status == 'online':
+                        logger.info("Status: ONLINE")
                     else:
                         logger.warning("Status: OUTAGE")
                 else:
-                    # Periodic status log (every ~10 min for visibility)
-                    if int(time.time()) % 600 < self.config.ping_interval_seconds:
+                    # Periodic status log (every 10 min for visibility)
+                    if loop_start >= self.next_status_log_time:
+                        self.next_status_log_time = loop_start + 600
                         if result.status == 'online' and result.ping_ms:
-                            logger.info(f"Status: online | Ping: {result.ping_ms:.1f}ms")
+                            logger.info("Status: online | Ping: %.1fms", result.ping_ms)
 
-                self._maybe_send_heartbeat()
-                self._shutdown_event.wait(self.config.ping_interval_seconds)
+                self.event_logger.flush_if_due()
+
+                # Sleep out the rest of the interval so slow pings don't add drift
+                sleep_left = max(0, self.config.ping_interval_seconds - (time.monotonic() - loop_start))
+                if selector.select(sleep_left):
+                    break
 
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
-                self._shutdown_event.wait(5)
+                selector.select(5)
 
+        selector.close()
+        self.ping_monitor.close()
+        self._speedtest_executor.shutdown(wait=False, cancel_futures=True)
+        self.event_logger.close()
         logger.info("NAS Internet Monitor stopped")
 
     def stop(self):
         """Stop the monitor gracefully."""
         self.running = False
-        self._shutdown_event.set()
+        try:
+            os.write(self.wakeup_fd, b'\0')
+        except BlockingIOError:
+            pass  # Pipe is full, so the loops are already awake
 
 
 class RequestHandler(BaseHTTPRequestHandler):
     """HTTP request handler for manual triggers."""
     monitor: InternetMonitor = None
+    protocol_version = 'HTTP/1.1'
 
     def log_message(self, format, *args):
-        logger.debug(f"HTTP: {args[0]}")
+        logger.debug("HTTP: %s", args[0])
+
+    def send_whole(self, code: int, body: bytes = b'', content_type: bytes = b'application/json'):
+        """Write the status line, headers and body in a single write."""
+        self.log_request(code)
+        reason = self.responses.get(code, ('',))[0].encode()
+        connection = b'close' if self.close_connection else b'keep-alive'
+        self.wfile.write(b'%s %d %s\r\nServer: %s\r\nDate: %s\r\nContent-Type: %s\r\n'
+                         b'Content-Length: %d\r\nConnection: %s\r\n\r\n%s' % (
+                             self.protocol_version.encode(), code, reason,
+                             self.version_string().encode(), self.date_time_string().encode(),
+                             content_type, len(body), connection, body))
+
+    def _run_speed_test(self, fn, *args, **kwargs):
+        """Run a speed test on the monitor's single speed test worker and wait for it."""
+        return self.monitor._speedtest_executor.submit(fn, *args, **kwargs).result()
 
     def do_GET(self):
         if self.path == '/speedtest':
-            result = self.monitor.request_speed_test(use_ookla=False)
+            result = self._run_speed_test(self.monitor.request_speed_test, use_ookla=False)
             if result:
-                response = f'{{"speed_mbps": {result.speed_mbps:.1f}, "trigger": "{result.trigger}", "test_type": "{result.test_type}"}}'
-                self.send_response(200)
+                self.send_whole(200, _json_bytes({
+                    'speed_mbps': round(result.speed_mbps, 1),
+                    'trigger': result.trigger,
+                    'test_type': result.test_type,
+                }))
             else:
-                response = '{"error": "Speed test failed"}'
-                self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(response.encode())
+                self.send_whole(500, b'{"error":"Speed test failed"}')
 
         elif self.path == '/speedtest/ookla':
-            result = self.monitor.request_speed_test(use_ookla=True)
+            result = self._run_speed_test(self.monitor.request_speed_test, use_ookla=True)
             if result:
-                upload = result.upload_mbps if result.upload_mbps else 0
-                response = f'{{"download_mbps": {result.speed_mbps:.1f}, "upload_mbps": {upload:.1f}, "test_type": "{result.test_type}"}}'
-                self.send_response(200)
+                self.send_whole(200, _json_bytes({
+                    'download_mbps': round(result.speed_mbps, 1),
+                    'upload_mbps': round(result.upload_mbps or 0, 1),
+                    'test_type': result.test_type,
+                }))
             else:
-                response = '{"error": "Ookla speed test failed"}'
-                self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(response.encode())
+                self.send_whole(500, b'{"error":"Ookla speed test failed"}')
 
         elif self.path == '/speedtest/full':
-            results = self.monitor.request_full_speed_test()
+            results = self._run_speed_test(self.monitor.request_full_speed_test)
             if results:
-                self.send_response(200)
-                response = json.dumps(results, indent=2)
+                self.send_whole(200, _json_bytes(results))
             else:
-                self.send_response(500)
-                response = '{"error": "Full speed test failed"}'
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(response.encode())
+                self.send_whole(500, b'{"error":"Full speed test failed"}')
 
         elif self.path == '/status':
             status = {
                 'running': self.monitor.running,
                 'last_status': self.monitor.last_status,
                 'in_slow_speed_mode': self.monitor.in_slow_speed_mode,
-                'last_speed_test': self.monitor.last_speed_test_time
+                'last_speed_test': self.monitor.last_speed_test_timestamp
             }
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
-            self.wfile.write(str(status).replace("'", '"').encode())
+            self.send_whole(200, _json_bytes(status))
 
         else:
-            self.send_response(404)
-            self.end_headers()
+            self.send_whole(404)
 
 
 def run_http_server(monitor: InternetMonitor, port: int):
     """Run the HTTP server in a separate thread."""
     RequestHandler.monitor = monitor
-    server = HTTPServer(('0.0.0.0', port), RequestHandler)
+    server = ThreadingHTTPServer(('0.0.0.0', port), RequestHandler)
     logger.info(f"HTTP server listening on port {port}")
     server.serve_forever()
 
@@ -933,6 +1304,8 @@ def main():
 
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
+    # Wake the monitor loops as soon as a signal lands, before the handler runs
+    signal.set_wakeup_fd(monitor.wakeup_fd)
 
     try:
         monitor.run()
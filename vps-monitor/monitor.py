@@ -6,6 +6,7 @@ Receives heartbeats from NAS monitor over Tailscale, tracks connectivity status,
 stores event history, provides a dashboard, and sends ntfy notifications.
 """
 
+import hashlib
 import json
 import logging
 import os
@@ -14,14 +15,51 @@ import sqlite3
 import sys
 import threading
 import time
+import weakref
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from queue import Queue, Empty, Full
+from typing import Callable, Optional
 
 import requests
 import yaml
 from flask import Flask, jsonify, request, send_file, Response
+from flask.json.provider import DefaultJSONProvider
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
+try:
+    from gunicorn.app.base import BaseApplication
+    GUNICORN_AVAILABLE = True
+except ImportError:
+    GUNICORN_AVAILABLE = False
+
+try:
+    import waitress
+except ImportError:
+    waitress = None
 
 # Configure logging
 logging.basicConfig(
@@ -342,16 +380,28 @@ DASHBOARD_HTML = '''<!DOCTYPE html>
 
         async function fetchData() {
             try {
-                const [summaryRes, historyRes] = await Promise.all([
+                // Ranges of a week or more chart hourly/daily averages, so raw
+                // history is only fetched for the events list
+                const aggregated = selectedHours >= 168;
+                const requests = [
                     fetch(`${basePath}/api/summary?hours=${selectedHours}`),
-                    fetch(`${basePath}/api/history?hours=${selectedHours}`)
-                ]);
+                    fetch(`${basePath}/api/history?hours=${selectedHours}&order=asc${aggregated ? '&limit=50' : ''}`)
+                ];
+                if (aggregated) {
+                    const bucket = selectedHours > 720 ? 86400 : 3600;
+                    requests.push(fetch(`${basePath}/api/history_aggregated?hours=${selectedHours}&bucket=${bucket}`));
+                }
+                const [summaryRes, historyRes, aggregatedRes] = await Promise.all(requests);
 
                 const summary = await summaryRes.json();
                 const history = await historyRes.json();
 
                 updateStatus(summary);
-                updateCharts(history.events);
+                if (aggregated) {
+                    updateAggregatedCharts((await aggregatedRes.json()).buckets);
+                } else {
+                    updateCharts(history.events);
+                }
                 updateEventsList(history.events);
                 document.getElementById('lastUpdate').textContent = new Date().toLocaleTimeString();
             } catch (err) {
@@ -400,13 +450,30 @@ DASHBOARD_HTML = '''<!DOCTYPE html>
                 }
             });
 
-            speedChart.data.datasets[0].data = speedData.reverse();
+            setChartData(speedData, uploadData, latencyData);
+        }
+
+        function updateAggregatedCharts(buckets) {
+            const speedData = [], uploadData = [], latencyData = [];
+
+            buckets.forEach(b => {
+                const x = new Date(b.timestamp * 1000);
+                if (b.speed_avg) speedData.push({ x, y: b.speed_avg });
+                if (b.upload_avg) uploadData.push({ x, y: b.upload_avg });
+                if (b.ping_avg) latencyData.push({ x, y: b.ping_avg });
+            });
+
+            setChartData(speedData, uploadData, latencyData);
+        }
+
+        function setChartData(speedData, uploadData, latencyData) {
+            speedChart.data.datasets[0].data = speedData;
             speedChart.update();
 
-            uploadChart.data.datasets[0].data = uploadData.reverse();
+            uploadChart.data.datasets[0].data = uploadData;
             uploadChart.update();
 
-            latencyChart.data.datasets[0].data = latencyData.reverse();
+            latencyChart.data.datasets[0].data = latencyData;
             latencyChart.update();
         }
 
@@ -417,7 +484,8 @@ DASHBOARD_HTML = '''<!DOCTYPE html>
                 return;
             }
 
-            list.innerHTML = events.slice(0, 50).map(e => {
+            // History arrives oldest first; the list shows the latest 50, newest at the top
+            list.innerHTML = events.slice(-50).reverse().map(e => {
                 const time = new Date(e.timestamp * 1000).toLocaleString();
                 let detail = '';
                 if (e.event_type === 'speed_test') {
@@ -544,6 +612,97 @@ DASHBOARD_HTML = '''<!DOCTYPE html>
 </html>
 '''
 
+# Encoded once at import; the ETag lets browsers revalidate instead of re-downloading
+DASHBOARD_HTML_BYTES = DASHBOARD_HTML.encode()
+DASHBOARD_ETAG = hashlib.blake2b(DASHBOARD_HTML_BYTES, digest_size=8).hexdigest()
+
+
+# Request bodies above these sizes are rejected with 413
+MAX_BODY_BYTES = 4096
+MAX_BATCH_BODY_BYTES = 256 * 1024
+
+# Response body for a routine heartbeat, serialized once
+HEARTBEAT_OK_BODY = b'{"result":{"event":"heartbeat"},"status":"ok"}\n'
+
+
+_ts_cache = (0, '')
+
+
+def _format_ts(now: float) -> str:
+    """Format a timestamp for the outage log, reusing the string within the same second."""
+    global _ts_cache
+    second = int(now)
+    cached_second, cached = _ts_cache
+    if second != cached_second:
+        cached = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(second))
+        _ts_cache = (second, cached)
+    return cached
+
+
+def _request_data(max_bytes: int = MAX_BODY_BYTES) -> dict:
+    """Decode the request body as CBOR or JSON depending on its Content-Type."""
+    if request.content_length and request.content_length > max_bytes:
+        raise RequestEntityTooLarge()
+    raw = request.stream.read(max_bytes + 1)
+    if len(raw) > max_bytes:
+        raise RequestEntityTooLarge()
+    if not raw:
+        return {}
+    if request.mimetype == 'application/cbor':
+        if cbor2 is None:
+            raise ValueError("CBOR payload received but cbor2 is not installed")
+        return cbor2.loads(raw) or {}
+    if orjson is not None:
+        return orjson.loads(raw) or {}
+    return json.loads(raw) or {}
+
+
+def _encode_data(data: dict) -> str:
+    """Serialize an event's data for the events table."""
+    if orjson is not None:
+        # Stored as text: SQLite would treat a bytes parameter as a BLOB
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data)
+
+
+# Decodes an events.data value
+_decode_data = orjson.loads if orjson is not None else json.loads
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def dumps_bytes(self, obj) -> bytes:
+        """Serialize straight to bytes for response bodies, skipping the str round trip."""
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _env_bool(value: str) -> bool:
+    """Parse a boolean environment variable."""
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Environment variable -> (Config attribute, converter)
+_ENV_MAP = {
+    'LISTEN_HOST': ('listen_host', str),
+    'LISTEN_PORT': ('listen_port', int),
+    'HEARTBEAT_TIMEOUT': ('heartbeat_timeout_seconds', int),
+    'NTFY_SERVER_URL': ('ntfy_server_url', str),
+    'NTFY_TOPIC': ('ntfy_topic', str),
+    'OUTAGE_LOG_FILE': ('outage_log_file', str),
+    'STARTUP_GRACE': ('startup_grace_seconds', int),
+    'DATABASE_FILE': ('database_file', str),
+    'RECORD_REMOTE_ADDR': ('record_remote_addr', _env_bool),
+    'EVENT_RETENTION_DAYS': ('event_retention_days', int),
+    'MAX_EVENTS': ('max_events', int),
+}
+
 
 @dataclass
 class Config:
@@ -551,14 +710,19 @@ class Config:
     listen_host: str = '0.0.0.0'
     listen_port: int = 5000
     heartbeat_timeout_seconds: int = 180  # 3 minutes
-    check_interval_seconds: int = 30
     ntfy_server_url: str = 'https://ntfy.sh'
     ntfy_topic: str = ''
     outage_log_file: str = './outages.log'
     speedtest_file: str = './speedtest/10MB.bin'
     database_file: str = './monitor.db'
+    # Delete dashboard events older than this many days (0 keeps everything)
+    event_retention_days: int = 0
+    # Delete the oldest dashboard events beyond this many (0 for no limit)
+    max_events: int = 0
     # Grace period after startup before sending DOWN notifications
     startup_grace_seconds: int = 120
+    # Store the sender's address with heartbeats and outage reports
+    record_remote_addr: bool = False
 
     @classmethod
     def load(cls, config_path: str = 'config.yaml') -> 'Config':
@@ -566,27 +730,18 @@ class Config:
         config = cls()
 
         # Load from YAML if exists
-        if os.path.exists(config_path):
+        try:
             with open(config_path, 'r') as f:
-                yaml_config = yaml.safe_load(f) or {}
-                for key, value in yaml_config.items():
-                    if hasattr(config, key):
-                        setattr(config, key, value)
-
-        # Override with environment variables
-        env_mappings = {
-            'LISTEN_HOST': ('listen_host', str),
-            'LISTEN_PORT': ('listen_port', int),
-            'HEARTBEAT_TIMEOUT': ('heartbeat_timeout_seconds', int),
-            'CHECK_INTERVAL': ('check_interval_seconds', int),
-            'NTFY_SERVER_URL': ('ntfy_server_url', str),
-            'NTFY_TOPIC': ('ntfy_topic', str),
-            'OUTAGE_LOG_FILE': ('outage_log_file', str),
-            'STARTUP_GRACE': ('startup_grace_seconds', int),
-            'DATABASE_FILE': ('database_file', str),
-        }
-
-        for env_var, (attr, converter) in env_mappings.items():
+                yaml_config = yaml.load(f, Loader=SafeLoader) or {}
+        except FileNotFoundError:
+            yaml_config = {}
+        for key, value in yaml_config.items():
+            if hasattr(config, key):
+                setattr(config, key, value)
+
+        # Override with environment variables (empty values, e.g. NTFY_TOPIC=""
+        # from the Dockerfile, leave the setting alone)
+        for env_var, (attr, converter) in _ENV_MAP.items():
             value = os.environ.get(env_var)
             if value:
                 try:
@@ -597,127 +752,556 @@ class Config:
         return config
 
 
+_CREATE_EVENTS_SQL = '''
+    CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp INTEGER NOT NULL,
+        event_type TEXT NOT NULL,
+        data TEXT NOT NULL,
+        source TEXT DEFAULT 'vps'
+    )
+'''
+# Timestamps are stored as integer unix microseconds; readers get float seconds and
+# the local datetime string formatted on read instead of a stored copy per row
+_EVENT_DATETIME = "strftime('%Y-%m-%d %H:%M:%S', events.timestamp / 1000000, 'unixepoch', 'localtime')"
+_EVENT_COLUMNS = (
+    f'id, events.timestamp / 1000000.0 AS timestamp, {_EVENT_DATETIME} AS datetime, event_type, data, source'
+)
+_INSERT_EVENT_SQL = 'INSERT INTO events (timestamp, event_type, data, source) VALUES (?, ?, ?, ?)'
+_SELECT_EVENTS_SQL = (
+    f'SELECT {_EVENT_COLUMNS} FROM events WHERE events.timestamp > ? ORDER BY events.timestamp DESC LIMIT ?'
+)
+_SELECT_EVENTS_BY_TYPE_SQL = (
+    f'SELECT {_EVENT_COLUMNS} FROM events WHERE event_type = ? AND events.timestamp > ? '
+    'ORDER BY events.timestamp DESC LIMIT ?'
+)
+# Whole events rendered as JSON by SQLite, for responses that pass them through unchanged
+_EVENT_JSON_COLUMN = (
+    """'{"id":' || id || ',"timestamp":' || printf('%!.17g', timestamp / 1000000.0)"""
+    f""" || ',"datetime":' || json_quote({_EVENT_DATETIME}) || ',"event_type":' || json_quote(event_type)"""
+    """ || ',"data":' || CASE WHEN json_valid(data) THEN data ELSE json_quote(data) END"""
+    """ || ',"source":' || json_quote(source) || '}'"""
+)
+_SELECT_EVENTS_JSON_SQL = (
+    f'SELECT {_EVENT_JSON_COLUMN}, timestamp FROM events WHERE timestamp > ? ORDER BY timestamp DESC LIMIT ?'
+)
+_SELECT_EVENTS_JSON_BY_TYPE_SQL = (
+    f'SELECT {_EVENT_JSON_COLUMN}, timestamp FROM events WHERE event_type = ? AND timestamp > ? '
+    'ORDER BY timestamp DESC LIMIT ?'
+)
+# Chart series averaged per time bucket; zero or missing readings are skipped as the
+# raw charts skip them
+_SELECT_HISTORY_BUCKETS_SQL = '''
+    SELECT timestamp / ? AS bucket,
+           round(avg(CASE WHEN event_type = 'speed_test'
+                          THEN nullif(json_extract(data, '$.speed_mbps'), 0) END), 2) AS speed_avg,
+           min(CASE WHEN event_type = 'speed_test' THEN nullif(json_extract(data, '$.speed_mbps'), 0) END) AS speed_min,
+           max(CASE WHEN event_type = 'speed_test' THEN json_extract(data, '$.speed_mbps') END) AS speed_max,
+           round(avg(CASE WHEN event_type = 'speed_test'
+                          THEN nullif(json_extract(data, '$.upload_mbps'), 0) END), 2) AS upload_avg,
+           round(avg(CASE WHEN event_type != 'speed_test'
+                          THEN nullif(json_extract(data, '$.ping_ms'), 0) END), 1) AS ping_avg,
+           count(*) AS n
+    FROM events
+    WHERE event_type IN ('speed_test', 'high_latency', 'latency') AND timestamp > ?
+    GROUP BY bucket
+    ORDER BY bucket
+'''
+# Pairs each down/outage_start with the first later restore: restores are counted in time
+# order (a restore sharing a down's timestamp sorts first), so the down that has seen n
+# restores is ended by restore n + 1
+_SELECT_OUTAGE_PAIRS_SQL = f'''
+    WITH status AS (
+        SELECT timestamp, {_EVENT_DATETIME} AS datetime, event_type, data,
+               count(CASE WHEN event_type IN ('restored', 'outage_end') THEN 1 END) OVER (
+                   ORDER BY timestamp, event_type IN ('restored', 'outage_end') DESC ROWS UNBOUNDED PRECEDING
+               ) AS restores
+        FROM events
+        WHERE event_type IN ('down', 'outage_start', 'restored', 'outage_end') AND timestamp > ?
+    )
+    SELECT d.timestamp / 1000000.0 AS timestamp, d.datetime,
+           CASE WHEN json_type(d.data, '$.reason') IS NULL THEN 'Connection lost'
+                ELSE json_extract(d.data, '$.reason') END AS reason,
+           r.timestamp / 1000000.0 AS resolved_at,
+           CASE WHEN r.timestamp IS NULL THEN NULL
+                WHEN json_type(r.data, '$.duration_seconds') IS NULL THEN 0
+                ELSE json_extract(r.data, '$.duration_seconds') END AS duration_seconds,
+           json_type(r.data, '$.nas_rebooted') AS nas_rebooted
+    FROM status d
+    LEFT JOIN status r ON r.restores = d.restores + 1 AND r.event_type IN ('restored', 'outage_end')
+    WHERE d.event_type IN ('down', 'outage_start')
+    ORDER BY d.timestamp
+'''
+_STATS_EVENT_TYPES = ('outage_start', 'down', 'outage_end', 'restored', 'high_latency', 'speed_test')
+_SELECT_STATS_EVENTS_SQL = (
+    'SELECT events.timestamp / 1000000.0 AS timestamp, event_type, data FROM events '
+    'WHERE events.timestamp > ? AND events.timestamp < ? '
+    f"AND event_type IN ({', '.join('?' * len(_STATS_EVENT_TYPES))})"
+)
+_UPSERT_STATS_SQL = '''
+    INSERT INTO stats_hourly (hour, outages, downtime_s, latency_events, speed_tests,
+                              speed_sum, speed_n, speed_min, speed_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(hour) DO UPDATE SET
+        outages = outages + excluded.outages,
+        downtime_s = downtime_s + excluded.downtime_s,
+        latency_events = latency_events + excluded.latency_events,
+        speed_tests = speed_tests + excluded.speed_tests,
+        speed_sum = speed_sum + excluded.speed_sum,
+        speed_n = speed_n + excluded.speed_n,
+        speed_min = min(coalesce(speed_min, excluded.speed_min), coalesce(excluded.speed_min, speed_min)),
+        speed_max = max(coalesce(speed_max, excluded.speed_max), coalesce(excluded.speed_max, speed_max))
+'''
+
+
+def _oldest_first(sql: str) -> str:
+    """Wrap a newest-first LIMIT query so the same rows come back oldest first."""
+    return f'SELECT * FROM ({sql}) ORDER BY timestamp'
+
+
+_DOWN_EVENT_TYPES = frozenset(('outage_start', 'down'))
+_RESTORED_EVENT_TYPES = frozenset(('outage_end', 'restored'))
+
+
+def _event_stats(timestamp: float, event_type: str, data: dict) -> Optional[tuple]:
+    """Return the stats_hourly row one event contributes, or None if it counts towards nothing."""
+    hour = int(timestamp // 3600 * 3600)
+    if event_type in _DOWN_EVENT_TYPES:
+        return (hour, 1, 0.0, 0, 0, 0.0, 0, None, None)
+    if event_type in _RESTORED_EVENT_TYPES:
+        return (hour, 0, data.get('duration_seconds') or 0.0, 0, 0, 0.0, 0, None, None)
+    if event_type == 'high_latency':
+        return (hour, 0, 0.0, 1, 0, 0.0, 0, None, None)
+    if event_type == 'speed_test':
+        speed = data.get('speed_mbps')
+        if speed:
+            return (hour, 0, 0.0, 0, 1, speed, 1, speed, speed)
+        return (hour, 0, 0.0, 0, 1, 0.0, 0, None, None)
+    return None
+
+
+class _ThreadConnection:
+    """Holds one thread's connection; dropped with the thread's locals when it exits."""
+
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
 class EventStore:
     """SQLite-based event storage for dashboard history."""
 
+    BATCH_SIZE = 50
+    FLUSH_INTERVAL_SECONDS = 0.2
+    # Old-event deletes run in chunks so inserts aren't locked out for the whole scan
+    CLEANUP_BATCH_SIZE = 500
+    MAINTENANCE_INTERVAL_SECONDS = 6 * 3600
+    # Stored in PRAGMA user_version once _init_db has set a database up; bump it
+    # when the schema changes so existing files run the setup again
+    SCHEMA_VERSION = 1
+
     def __init__(self, config: Config):
         self.db_path = Path(config.database_file)
+        self.retention_days = config.event_retention_days
+        self.max_events = config.max_events
         self._init_db()
+        # Each request thread keeps its own connection, so its prepared
+        # statements stay cached between calls; it is closed when the thread
+        # exits, so servers that start a thread per request don't leak them
+        self._local = threading.local()
+        self._connections: set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        # Rows are inserted by a background writer in batches, one transaction
+        # per batch; None tells the writer to stop
+        self._queue: Queue[Optional[tuple]] = Queue(maxsize=4096)
+        self._writer: Optional[threading.Thread] = None
+        # Bumped after every write so cached responses built from older data are skipped
+        self.generation = 0
 
     def _get_connection(self) -> sqlite3.Connection:
         """Get a database connection (thread-safe)."""
         conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        # Per-connection settings; WAL itself is persisted in the file by _init_db
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA cache_size=-20000')
+        conn.execute('PRAGMA busy_timeout=5000')
         return conn
 
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._get_connection())
+            with self._connections_lock:
+                self._connections.add(holder.conn)
+            weakref.finalize(holder, self._release_connection, holder.conn)
+        return holder.conn
+
+    def _release_connection(self, conn: sqlite3.Connection):
+        """Close a connection whose thread has exited."""
+        with self._connections_lock:
+            self._connections.discard(conn)
+        conn.close()
+
+    def _tuple_cursor(self) -> sqlite3.Cursor:
+        """Return a cursor on this thread's connection that yields plain tuples, for bulk row decoding."""
+        cursor = self._connection().cursor()
+        cursor.row_factory = None
+        return cursor
+
     def _init_db(self):
-        """Initialize database tables."""
-        with self._get_connection() as conn:
+        """Initialize database tables, unless the file is already at the current schema version."""
+        conn = self._get_connection()
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= self.SCHEMA_VERSION:
+            conn.close()
+            return
+        with conn:
+            # WAL lets dashboard reads run alongside writes, and with
+            # synchronous=NORMAL a commit no longer fsyncs a rollback journal
+            conn.execute('PRAGMA journal_mode=WAL')
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(events)')}
+            if 'datetime' in columns:
+                self._migrate_events(conn)
+            conn.execute(_CREATE_EVENTS_SQL)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_type_ts ON events(event_type, timestamp DESC)')
+            # Per-hour dashboard counters, kept up to date as events are added
+            # so /api/summary doesn't rescan the events table
+            backfill = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_hourly'"
+            ).fetchone() is None
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp REAL NOT NULL,
-                    datetime TEXT NOT NULL,
-                    event_type TEXT NOT NULL,
-                    data TEXT NOT NULL,
-                    source TEXT DEFAULT 'vps'
+                CREATE TABLE IF NOT EXISTS stats_hourly (
+                    hour INTEGER PRIMARY KEY,
+                    outages INTEGER NOT NULL,
+                    downtime_s REAL NOT NULL,
+                    latency_events INTEGER NOT NULL,
+                    speed_tests INTEGER NOT NULL,
+                    speed_sum REAL NOT NULL,
+                    speed_n INTEGER NOT NULL,
+                    speed_min REAL,
+                    speed_max REAL
                 )
             ''')
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON events(timestamp)')
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_event_type ON events(event_type)')
-            conn.commit()
+            if backfill:
+                cursor = conn.execute(_SELECT_STATS_EVENTS_SQL, (0, float('inf'), *_STATS_EVENT_TYPES))
+                conn.executemany(_UPSERT_STATS_SQL, (
+                    _event_stats(row['timestamp'], row['event_type'], _decode_data(row['data']))
+                    for row in cursor.fetchall()
+                ))
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        conn.close()
+
+    @staticmethod
+    def _migrate_events(conn: sqlite3.Connection):
+        """Rewrite a pre-microsecond events table: integer timestamps, no stored datetime."""
+        logger.info("Migrating event store to integer timestamps...")
+        conn.executescript(f'''
+            BEGIN;
+            ALTER TABLE events RENAME TO events_old;
+            {_CREATE_EVENTS_SQL};
+            INSERT INTO events (id, timestamp, event_type, data, source)
+                SELECT id, CAST(round(timestamp * 1000000) AS INTEGER), event_type, data, source FROM events_old;
+            DROP TABLE events_old;
+            COMMIT;
+            VACUUM;
+        ''')
+
+    def start(self):
+        """Start the background writer in the serving process."""
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name='event-store')
+        self._writer.start()
+
+    def close(self):
+        """Write any queued events, stop the background writer and close connections."""
+        if self._writer:
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+            self._writer = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    def _write_loop(self):
+        """Insert queued rows once a batch fills or the oldest row has waited long enough."""
+        conn = self._get_connection()
+        conn.isolation_level = 'IMMEDIATE'
+        rows = []
+        deadline = 0.0
+        next_maintenance = time.monotonic() + self.MAINTENANCE_INTERVAL_SECONDS
+        running = True
+        while running:
+            wake = min(deadline, next_maintenance) if rows else next_maintenance
+            try:
+                item = self._queue.get(timeout=max(wake - time.monotonic(), 0))
+            except Empty:
+                item = ()
+            if item is None:
+                running = False
+            elif item:
+                if not rows:
+                    deadline = time.monotonic() + self.FLUSH_INTERVAL_SECONDS
+                rows.append(item)
+            if rows and (not running or len(rows) >= self.BATCH_SIZE or time.monotonic() >= deadline):
+                try:
+                    with conn:
+                        self._insert(conn, rows)
+                    self.generation += 1
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to store {len(rows)} events: {e}")
+                rows = []
+            if running and time.monotonic() >= next_maintenance:
+                self._maintain(conn)
+                next_maintenance = time.monotonic() + self.MAINTENANCE_INTERVAL_SECONDS
+        conn.close()
+
+    def _maintain(self, conn: sqlite3.Connection):
+        """Apply the retention period and event cap, then shrink the WAL file."""
+        try:
+            if self.retention_days > 0:
+                self.cleanup_old_events(self.retention_days, conn)
+            if self.max_events > 0:
+                self.trim_events(self.max_events, conn)
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        except sqlite3.Error as e:
+            logger.error(f"Event store maintenance failed: {e}")
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, items: list):
+        """Insert (row, stats) pairs and fold the stats into stats_hourly. Caller owns the transaction."""
+        conn.executemany(_INSERT_EVENT_SQL, [row for row, _ in items])
+        stats = [stats for _, stats in items if stats]
+        if stats:
+            conn.executemany(_UPSERT_STATS_SQL, stats)
 
     def add_event(self, event_type: str, data: dict, source: str = 'vps'):
         """Add an event to the store."""
         timestamp = data.get('timestamp', time.time())
-        datetime_str = data.get('datetime_str', datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-        with self._get_connection() as conn:
-            conn.execute(
-                'INSERT INTO events (timestamp, datetime, event_type, data, source) VALUES (?, ?, ?, ?, ?)',
-                (timestamp, datetime_str, event_type, json.dumps(data), source)
-            )
-            conn.commit()
+        item = ((round(timestamp * 1_000_000), event_type, _encode_data(data), source),
+                _event_stats(timestamp, event_type, data))
+        if self._writer is None:
+            conn = self._connection()
+            with conn:
+                self._insert(conn, [item])
+            self.generation += 1
+            return
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            logger.error(f"Event queue full, dropping {event_type} event")
+
+    def get_events(self, event_type: str = None, hours: int = 24, limit: int = 1000,
+                   order: str = 'desc') -> list:
+        """Get the latest events, optionally of one type only, oldest first if order is 'asc'."""
+        cutoff = round((time.time() - hours * 3600) * 1_000_000)
+        if event_type:
+            sql, params = _SELECT_EVENTS_BY_TYPE_SQL, (event_type, cutoff, limit)
+        else:
+            sql, params = _SELECT_EVENTS_SQL, (cutoff, limit)
+        if order == 'asc':
+            sql = _oldest_first(sql)
+        return [
+            {
+                'id': event_id,
+                'timestamp': timestamp,
+                'datetime': datetime_str,
+                'event_type': event_type,
+                'data': _decode_data(data),
+                'source': source
+            }
+            for event_id, timestamp, datetime_str, event_type, data, source
+            in self._tuple_cursor().execute(sql, params)
+        ]
+
+    def get_events_json(self, event_type: str = None, hours: int = 24, limit: int = 1000,
+                        order: str = 'desc') -> list[str]:
+        """Get events as JSON object strings built by SQLite, skipping the decode/encode round trip."""
+        cutoff = round((time.time() - hours * 3600) * 1_000_000)
+        if event_type:
+            sql, params = _SELECT_EVENTS_JSON_BY_TYPE_SQL, (event_type, cutoff, limit)
+        else:
+            sql, params = _SELECT_EVENTS_JSON_SQL, (cutoff, limit)
+        if order == 'asc':
+            sql = _oldest_first(sql)
+        return [row[0] for row in self._connection().execute(sql, params).fetchall()]
+
+    def get_history_buckets(self, hours: int = 168, bucket_seconds: int = 3600) -> list:
+        """Get speed, upload and latency averages per time bucket for long chart ranges."""
+        cutoff = round((time.time() - hours * 3600) * 1_000_000)
+        rows = self._tuple_cursor().execute(_SELECT_HISTORY_BUCKETS_SQL, (bucket_seconds * 1_000_000, cutoff))
+        return [
+            {
+                'timestamp': bucket * bucket_seconds,
+                'speed_avg': speed_avg,
+                'speed_min': speed_min,
+                'speed_max': speed_max,
+                'upload_avg': upload_avg,
+                'ping_avg': ping_avg,
+                'count': n,
+            }
+            for bucket, speed_avg, speed_min, speed_max, upload_avg, ping_avg, n in rows
+        ]
+
+    def get_outage_pairs(self, hours: int = 168) -> list:
+        """Get outages in time order, each with the duration and reboot flag of the restore that ended it."""
+        cutoff = round((time.time() - hours * 3600) * 1_000_000)
+        rows = self._tuple_cursor().execute(_SELECT_OUTAGE_PAIRS_SQL, (cutoff,))
+        return [
+            {
+                'timestamp': timestamp,
+                'datetime': datetime_str,
+                'reason': reason,
+                'resolved_at': resolved_at,
+                'duration_seconds': duration,
+                'nas_rebooted': {'true': True, 'false': False}.get(nas_rebooted),
+            }
+            for timestamp, datetime_str, reason, resolved_at, duration, nas_rebooted in rows
+        ]
 
-    def get_events(self, event_type: str = None, hours: int = 24, limit: int = 1000) -> list:
-        """Get events from the store."""
+    def get_summary_stats(self, hours: int = 24) -> dict:
+        """Get speed, outage and latency totals for the last hours from the hourly counters."""
         cutoff = time.time() - (hours * 3600)
-        with self._get_connection() as conn:
-            if event_type:
-                cursor = conn.execute(
-                    'SELECT * FROM events WHERE event_type = ? AND timestamp > ? ORDER BY timestamp DESC LIMIT ?',
-                    (event_type, cutoff, limit)
-                )
-            else:
-                cursor = conn.execute(
-                    'SELECT * FROM events WHERE timestamp > ? ORDER BY timestamp DESC LIMIT ?',
-                    (cutoff, limit)
-                )
-            rows = cursor.fetchall()
-            return [
-                {
-                    'id': row['id'],
-                    'timestamp': row['timestamp'],
-                    'datetime': row['datetime'],
-                    'event_type': row['event_type'],
-                    'data': json.loads(row['data']),
-                    'source': row['source']
-                }
-                for row in rows
-            ]
-
-    def get_uptime_periods(self, hours: int = 24) -> list:
-        """Get uptime/downtime periods for timeline visualization."""
-        events = self.get_events(hours=hours, limit=5000)
-        # Filter to status change events
-        status_events = [e for e in events if e['event_type'] in ('down', 'restored', 'heartbeat_first')]
-        status_events.sort(key=lambda x: x['timestamp'])
-        return status_events
-
-    def get_speed_tests(self, hours: int = 168) -> list:  # 7 days default
-        """Get speed test results."""
-        return self.get_events(event_type='speed_test', hours=hours)
-
-    def get_latency_events(self, hours: int = 24) -> list:
-        """Get high latency events."""
-        return self.get_events(event_type='high_latency', hours=hours)
-
-    def get_outages(self, hours: int = 168) -> list:  # 7 days default
-        """Get outage events."""
-        events = self.get_events(hours=hours)
-        return [e for e in events if e['event_type'] in ('outage_start', 'outage_end', 'down', 'restored')]
-
-    def cleanup_old_events(self, days: int = 30):
-        """Delete events older than specified days."""
-        cutoff = time.time() - (days * 86400)
-        with self._get_connection() as conn:
-            conn.execute('DELETE FROM events WHERE timestamp < ?', (cutoff,))
-            conn.commit()
+        first_hour = -(-cutoff // 3600) * 3600
+        conn = self._connection()
+        totals = conn.execute(
+            'SELECT coalesce(sum(outages), 0), coalesce(sum(downtime_s), 0), coalesce(sum(latency_events), 0), '
+            'coalesce(sum(speed_tests), 0), coalesce(sum(speed_sum), 0), coalesce(sum(speed_n), 0), '
+            'min(speed_min), max(speed_max) FROM stats_hourly WHERE hour >= ?',
+            (first_hour,)
+        ).fetchone()
+        outages, downtime, latency, tests, speed_sum, speed_n, speed_min, speed_max = totals
+        # The window starts part-way through an hour; count that slice from the events themselves
+        for row in conn.execute(_SELECT_STATS_EVENTS_SQL,
+                                (cutoff * 1_000_000, first_hour * 1_000_000, *_STATS_EVENT_TYPES)):
+            _, o, d, l, t, ss, sn, smin, smax = _event_stats(
+                row['timestamp'], row['event_type'], _decode_data(row['data']))
+            outages, downtime, latency, tests = outages + o, downtime + d, latency + l, tests + t
+            speed_sum, speed_n = speed_sum + ss, speed_n + sn
+            if smin is not None:
+                speed_min = smin if speed_min is None else min(speed_min, smin)
+                speed_max = smax if speed_max is None else max(speed_max, smax)
+        return {
+            'speed_stats': {
+                'average': round(speed_sum / speed_n, 1) if speed_n else None,
+                'min': round(speed_min, 1) if speed_min else None,
+                'max': round(speed_max, 1) if speed_max else None,
+                'test_count': tests
+            },
+            'outage_stats': {
+                'count': outages,
+                'total_downtime_seconds': downtime
+            },
+            'latency_events': latency,
+        }
+
+    def cleanup_old_events(self, days: int = 30, conn: sqlite3.Connection = None):
+        """Delete events older than specified days, one short transaction per chunk."""
+        # Cut on an hour boundary so whole stats_hourly buckets go with their events
+        self._delete_before((time.time() - (days * 86400)) // 3600 * 3600, conn or self._connection())
+
+    def trim_events(self, max_events: int, conn: sqlite3.Connection = None):
+        """Delete the oldest events beyond max_events, rounded out to whole hours."""
+        conn = conn or self._connection()
+        row = conn.execute(
+            'SELECT timestamp FROM events ORDER BY timestamp DESC LIMIT 1 OFFSET ?', (max_events,)
+        ).fetchone()
+        if row:
+            # The hour holding the first event over the cap goes as well, so at most
+            # max_events remain and stats_hourly keeps whole buckets
+            self._delete_before((row[0] // 3_600_000_000 + 1) * 3600, conn)
+
+    def _delete_before(self, cutoff: float, conn: sqlite3.Connection):
+        """Delete events and hourly stats before an hour-aligned cutoff in seconds."""
+        while True:
+            with conn:
+                deleted = conn.execute(
+                    'DELETE FROM events WHERE id IN (SELECT id FROM events WHERE timestamp < ? LIMIT ?)',
+                    (cutoff * 1_000_000, self.CLEANUP_BATCH_SIZE)
+                ).rowcount
+            if deleted < self.CLEANUP_BATCH_SIZE:
+                break
+            time.sleep(0.05)
+        with conn:
+            conn.execute('DELETE FROM stats_hourly WHERE hour < ?', (cutoff,))
+        self.generation += 1
+
+
+@dataclass(frozen=True, slots=True)
+class HeartbeatState:
+    """Immutable copy of the heartbeat fields /status reports."""
+    is_online: bool
+    last_heartbeat_time: Optional[float]
+    last_heartbeat_monotonic: Optional[float]
+    outage_start_time: Optional[float]
 
 
 class HeartbeatTracker:
     """Tracks heartbeat status from NAS."""
 
+    __slots__ = (
+        'config', 'last_heartbeat_time', 'last_heartbeat_data', 'is_online', 'outage_start_time',
+        'startup_time', '_grace_end', '_timeout', '_last_heartbeat_monotonic', '_deadline',
+        'on_down', '_watchdog', '_wake', '_stopping', '_lock', 'last_boot_id',
+        'boot_id_before_outage', '_state',
+    )
+
+    # Heartbeats closer together than this while online are acknowledged without being recorded
+    COALESCE_SECONDS = 0.5
+
     def __init__(self, config: Config):
         self.config = config
         self.last_heartbeat_time: Optional[float] = None
         self.last_heartbeat_data: Optional[dict] = None
         self.is_online = True
         self.outage_start_time: Optional[float] = None
-        self.startup_time = time.time()
+        # Grace and timeout checks use the monotonic clock so NTP steps can't
+        # fake or hide an outage; the wall-clock times above are for reporting
+        self.startup_time = time.monotonic()
+        self._grace_end = self.startup_time + config.startup_grace_seconds
+        self._timeout = config.heartbeat_timeout_seconds
+        self._last_heartbeat_monotonic: Optional[float] = None
+        # Monotonic time after which the NAS counts as overdue, set by each heartbeat
+        self._deadline: Optional[float] = None
+        # Instead of polling, one watchdog thread sleeps until the grace period
+        # ends or the NAS would become overdue; heartbeats only move the deadline,
+        # and _wake is set when the watchdog must look again early
+        self.on_down: Optional[Callable[[dict], None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stopping = False
         self._lock = threading.Lock()
         # Track boot_id to detect NAS reboots (power cuts)
         self.last_boot_id: Optional[str] = None
         self.boot_id_before_outage: Optional[str] = None
-
-    def record_heartbeat(self, data: dict):
+        # Rebound as a whole by writers under the lock, so get_status reads one
+        # consistent state without taking the lock
+        self._state = HeartbeatState(self.is_online, self.last_heartbeat_time,
+                                     self._last_heartbeat_monotonic, self.outage_start_time)
+
+    def _publish(self):
+        """Swap in a new state snapshot. Caller holds the lock."""
+        self._state = HeartbeatState(self.is_online, self.last_heartbeat_time,
+                                     self._last_heartbeat_monotonic, self.outage_start_time)
+
+    # The clock functions are bound as default arguments so these per-request
+    # methods look them up as locals
+    def record_heartbeat(self, data: dict, _time=time.time, _monotonic=time.monotonic):
         """Record a received heartbeat."""
         with self._lock:
-            now = time.time()
+            now = _time()
             was_offline = not self.is_online
             new_boot_id = data.get('boot_id', '')
             new_uptime = data.get('uptime_seconds', 0)
 
             self.last_heartbeat_time = now
+            self._last_heartbeat_monotonic = _monotonic()
+            self._deadline = self._last_heartbeat_monotonic + self._timeout
             self.last_heartbeat_data = data
             self.is_online = True
 
@@ -733,6 +1317,9 @@ class HeartbeatTracker:
 
                 self.last_boot_id = new_boot_id
                 self.boot_id_before_outage = None
+                self._publish()
+                # The watchdog waits indefinitely while offline
+                self._wake.set()
 
                 return {
                     'event': 'restored',
@@ -744,58 +1331,112 @@ class HeartbeatTracker:
 
             # Update boot_id tracking
             self.last_boot_id = new_boot_id
+            self._publish()
             return {'event': 'heartbeat'}
 
-    def check_status(self) -> Optional[dict]:
-        """Check if we've missed heartbeats (called periodically)."""
-        with self._lock:
-            now = time.time()
+    def recently_seen(self) -> bool:
+        """Return True if online and the last heartbeat is inside the coalescing window."""
+        # Read from the snapshot without the lock; a stale answer only means one
+        # extra heartbeat gets recorded
+        state = self._state
+        last = state.last_heartbeat_monotonic
+        return state.is_online and last is not None and time.monotonic() - last < self.COALESCE_SECONDS
+
+    def start(self):
+        """Start the watchdog thread that detects missed heartbeats."""
+        # Under gunicorn the tracker is built in the master and each worker
+        # starts it after the fork, so every worker gets its own grace period
+        self.startup_time = time.monotonic()
+        self._grace_end = self.startup_time + self.config.startup_grace_seconds
+        self._stopping = False
+        self._watchdog = threading.Thread(target=self._watch_loop, daemon=True, name='heartbeat-watchdog')
+        self._watchdog.start()
 
-            # Don't check during startup grace period
-            if now - self.startup_time < self.config.startup_grace_seconds:
-                return None
+    def stop(self):
+        """Stop the watchdog thread."""
+        self._stopping = True
+        self._wake.set()
+        if self._watchdog:
+            self._watchdog.join(timeout=5)
+            self._watchdog = None
+
+    def _next_check_delay(self) -> Optional[float]:
+        """Seconds until a timeout check could find the NAS down, or None to wait for a heartbeat."""
+        monotonic_now = time.monotonic()
+        if monotonic_now < self._grace_end:
+            return self._grace_end - monotonic_now
+        if not self._state.is_online:
+            return None
+        deadline = self._deadline
+        return 0 if deadline is None else max(deadline - monotonic_now, 0)
+
+    def _watch_loop(self):
+        """Sleep until the next possible timeout and report a DOWN when it is reached."""
+        while not self._stopping:
+            if self._wake.wait(self._next_check_delay()):
+                self._wake.clear()
+                continue
+            try:
+                result = self.check_status()
+                if result and self.on_down:
+                    self.on_down(result)
+            except Exception as e:
+                logger.error(f"Error in heartbeat timeout check: {e}")
+
+    def check_status(self, _time=time.time, _monotonic=time.monotonic) -> Optional[dict]:
+        """Check if we've missed heartbeats."""
+        # Nothing can be due while offline, in the grace period or before the
+        # deadline; those checks need no lock, only the transition to down does
+        monotonic_now = _monotonic()
+        deadline = self._deadline
+        if (not self._state.is_online or monotonic_now < self._grace_end
+                or (deadline is not None and monotonic_now <= deadline)):
+            return None
+        with self._lock:
+            now = _time()
+            monotonic_now = _monotonic()
 
             # If we've never received a heartbeat, start tracking
-            if self.last_heartbeat_time is None:
+            if self._deadline is None:
                 if self.is_online:
                     self.is_online = False
                     self.outage_start_time = now
                     self.boot_id_before_outage = self.last_boot_id
+                    self._publish()
                     return {'event': 'down', 'reason': 'no_heartbeat_received'}
                 return None
 
             # Check if heartbeat is overdue
-            time_since_heartbeat = now - self.last_heartbeat_time
-            if time_since_heartbeat > self.config.heartbeat_timeout_seconds:
+            if monotonic_now > self._deadline:
                 if self.is_online:
                     self.is_online = False
                     self.outage_start_time = self.last_heartbeat_time
                     self.boot_id_before_outage = self.last_boot_id
+                    self._publish()
                     return {
                         'event': 'down',
                         'reason': 'heartbeat_timeout',
-                        'last_heartbeat_age': time_since_heartbeat
+                        'last_heartbeat_age': monotonic_now - self._last_heartbeat_monotonic
                     }
 
             return None
 
-    def get_status(self) -> dict:
+    def get_status(self, _time=time.time, _monotonic=time.monotonic) -> dict:
         """Get current status for API endpoint."""
-        with self._lock:
-            now = time.time()
-            return {
-                'is_online': self.is_online,
-                'last_heartbeat_time': self.last_heartbeat_time,
-                'last_heartbeat_age_seconds': (
-                    now - self.last_heartbeat_time
-                    if self.last_heartbeat_time else None
-                ),
-                'outage_start_time': self.outage_start_time,
-                'current_outage_duration_seconds': (
-                    now - self.outage_start_time
-                    if self.outage_start_time else None
-                )
-            }
+        state = self._state
+        return {
+            'is_online': state.is_online,
+            'last_heartbeat_time': state.last_heartbeat_time,
+            'last_heartbeat_age_seconds': (
+                _monotonic() - state.last_heartbeat_monotonic
+                if state.last_heartbeat_monotonic is not None else None
+            ),
+            'outage_start_time': state.outage_start_time,
+            'current_outage_duration_seconds': (
+                _time() - state.outage_start_time
+                if state.outage_start_time else None
+            )
+        }
 
 
 class NtfyNotifier:
@@ -804,32 +1445,103 @@ class NtfyNotifier:
     def __init__(self, config: Config):
         self.config = config
         self.session = requests.Session()
+        self.session.headers.update({'User-Agent': 'vps-monitor/1.0'})
+        # Retry failed connects so a DOWN alert isn't lost to a blip, but never a
+        # POST ntfy may already have accepted, which would push a duplicate alert
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=Retry(
+            total=3, connect=3, read=0, status=0, other=0, backoff_factor=0.3))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Alerts are posted from a background thread so callers never wait on
+        # ntfy; None tells the sender to stop
+        self._queue: Queue[Optional[tuple]] = Queue(maxsize=32)
+        self._sender: Optional[threading.Thread] = None
+        # The topic URL and the headers for the two alert kinds never change
+        self._url = f"{config.ntfy_server_url}/{config.ntfy_topic}"
+        self._headers_down = {'Title': 'Home Network DOWN', 'Priority': 'high',
+                              'Tags': 'warning,house'}
+        self._headers_restored = {'Title': 'Home Network RESTORED', 'Priority': 'default',
+                                  'Tags': 'white_check_mark,house'}
+        # DOWN alert bodies for every reason the tracker reports
+        self._down_payloads = {
+            reason: f"No heartbeat received from NAS monitor ({reason})".encode('utf-8')
+            for reason in ('no_heartbeat_received', 'heartbeat_timeout', 'unknown')
+        }
+
+    def start(self):
+        """Start the background sender in the serving process."""
+        self._sender = threading.Thread(target=self._send_loop, daemon=True, name='ntfy')
+        self._sender.start()
+
+    def close(self):
+        """Send any queued notifications and stop the background sender."""
+        if self._sender:
+            self._queue.put(None)
+            self._sender.join(timeout=15)
+            self._sender = None
+
+    def _send_loop(self):
+        """Warm the connection, then send queued notifications in order."""
+        self.warmup()
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._post(*item)
+            except Exception as e:
+                logger.error(f"Failed to send notification: {e}")
+
+    def _enqueue(self, headers: dict, body: bytes):
+        """Queue a notification for the sender thread, dropping the oldest if full."""
+        item = (headers, body)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                    logger.warning(f"Notification queue full, dropping: {dropped[0]['Title']}")
+                except Empty:
+                    pass
+
+    def warmup(self):
+        """Open the connection to the ntfy server ahead of the first notification."""
+        if not self.config.ntfy_topic:
+            return
+        try:
+            self.session.head(self._url, timeout=5)
+        except requests.RequestException as e:
+            logger.debug(f"ntfy warmup failed: {e}")
 
     def send(self, title: str, message: str, priority: str = 'default',
              tags: list = None) -> bool:
         """Send a notification to ntfy."""
+        headers = {
+            'Title': title,
+            'Priority': priority,
+        }
+        if tags:
+            headers['Tags'] = ','.join(tags)
+        return self._post(headers, message.encode('utf-8'))
+
+    def _post(self, headers: dict, body: bytes) -> bool:
+        """POST an encoded message with a prepared set of ntfy headers."""
         if not self.config.ntfy_topic:
             logger.warning("No ntfy topic configured, skipping notification")
             return False
 
         try:
-            url = f"{self.config.ntfy_server_url}/{self.config.ntfy_topic}"
-            headers = {
-                'Title': title,
-                'Priority': priority,
-            }
-            if tags:
-                headers['Tags'] = ','.join(tags)
-
             response = self.session.post(
-                url,
-                data=message.encode('utf-8'),
+                self._url,
+                data=body,
                 headers=headers,
-                timeout=10
+                timeout=5
             )
 
             if response.status_code == 200:
-                logger.info(f"Notification sent: {title}")
+                logger.info(f"Notification sent: {headers['Title']}")
                 return True
             else:
                 logger.error(f"Failed to send notification: {response.status_code}")
@@ -841,13 +1553,11 @@ class NtfyNotifier:
 
     def notify_down(self, reason: str = None):
         """Send notification that home network is down."""
-        extra = f" ({reason})" if reason else ""
-        self.send(
-            title="Home Network DOWN",
-            message=f"No heartbeat received from NAS monitor{extra}",
-            priority='high',
-            tags=['warning', 'house']
-        )
+        body = self._down_payloads.get(reason)
+        if body is None:
+            extra = f" ({reason})" if reason else ""
+            body = f"No heartbeat received from NAS monitor{extra}".encode('utf-8')
+        self._enqueue(self._headers_down, body)
 
     def notify_restored(self, duration_seconds: float):
         """Send notification that home network is restored."""
@@ -860,64 +1570,350 @@ class NtfyNotifier:
             hours = duration_min / 60
             duration_str = f"{hours:.1f} hours"
 
-        self.send(
-            title="Home Network RESTORED",
-            message=f"Connection restored after {duration_str}",
-            priority='default',
-            tags=['white_check_mark', 'house']
-        )
+        self._enqueue(self._headers_restored, f"Connection restored after {duration_str}".encode('utf-8'))
 
 
 class OutageLogger:
     """Logs outage events to a file."""
 
+    BATCH_SIZE = 64
+
     def __init__(self, config: Config):
         self.config = config
         self.log_path = Path(config.outage_log_file)
         self._ensure_log_file()
+        self._fh = None
+        # Lines are written by a background thread so request handlers never
+        # block on the file; None tells the writer to stop
+        self._queue: Queue[Optional[str]] = Queue(maxsize=1024)
+        self._writer: Optional[threading.Thread] = None
 
     def _ensure_log_file(self):
         """Ensure log file directory exists."""
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
 
+    def start(self):
+        """Open the log file and start the background writer in the serving process."""
+        try:
+            self._fh = open(self.log_path, 'a', buffering=8192)
+        except OSError as e:
+            logger.error(f"Failed to open outage log: {e}")
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name='outage-log')
+        self._writer.start()
+
+    def _write_loop(self):
+        """Write queued lines in batches, flushing once per batch."""
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [line for line in batch if line is not None]
+            if not batch or not self._fh:
+                continue
+            try:
+                self._fh.write(''.join(batch))
+                self._fh.flush()
+            except OSError as e:
+                logger.error(f"Failed to log outage: {e}")
+
     def log_outage(self, outage_data: dict):
         """Log an outage event."""
+        timestamp = _format_ts(time.time())
         try:
-            with open(self.log_path, 'a') as f:
-                timestamp = datetime.now().isoformat()
-                f.write(f"{timestamp} | {outage_data}\n")
-        except OSError as e:
-            logger.error(f"Failed to log outage: {e}")
+            self._queue.put_nowait(f"{timestamp} | {outage_data}\n")
+        except Full:
+            logger.error("Outage log queue full, dropping entry")
+
+    def close(self):
+        """Write any queued lines and close the log file."""
+        if self._writer:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+class ResponseCache:
+    """Keeps recently serialized API responses for a few seconds."""
+
+    def __init__(self, ttl: float, maxsize: int = 8):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: dict = {}
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[tuple[bytes, str]]:
+        """Return the cached (body, etag) for key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1], entry[2]
+        return None
+
+    def put(self, key, body: bytes) -> tuple[bytes, str]:
+        """Cache body under key and return it with its ETag."""
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.maxsize:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag)
+        return body, etag
 
 
 class VPSMonitor:
     """Main VPS monitor application."""
 
+    # How long dashboard summary and incident responses are reused
+    RESPONSE_CACHE_SECONDS = 15
+
     def __init__(self, config: Config):
         self.config = config
         self.tracker = HeartbeatTracker(config)
         self.notifier = NtfyNotifier(config)
         self.outage_logger = OutageLogger(config)
         self.event_store = EventStore(config)
+        self._response_cache = ResponseCache(self.RESPONSE_CACHE_SECONDS)
+        # Speed tests triggered from the dashboard are proxied to the NAS one at
+        # a time, so repeated clicks can't tie up every worker thread
+        self._nas_session = requests.Session()
+        self._nas_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._speedtest_lock = threading.Lock()
 
         self.app = Flask(__name__)
+        if orjson is not None:
+            self.app.json = OrjsonProvider(self.app)
+        if Compress is not None:
+            # Long-range history responses run to hundreds of KB of repetitive JSON
+            self.app.config.update(
+                COMPRESS_MIMETYPES=['application/json'],
+                COMPRESS_ALGORITHM=['gzip', 'deflate'],
+                COMPRESS_LEVEL=4,
+                COMPRESS_MIN_SIZE=1024,
+            )
+            Compress(self.app)
         self._setup_routes()
+        self.app.wsgi_app = self._heartbeat_fast_path(self.app.wsgi_app)
 
         self.running = False
-        self._check_thread: Optional[threading.Thread] = None
+        self.tracker.on_down = self._handle_down
+
+    def _record_outage_report(self, data: dict):
+        """Log and store one outage report from the NAS."""
+        data['received_at'] = time.time()
+        if self.config.record_remote_addr:
+            data['remote_addr'] = request.environ.get('REMOTE_ADDR')
+
+        logger.info(f"Outage report received: {data}")
+        self.outage_logger.log_outage({
+            'type': 'nas_report',
+            'data': data
+        })
+        self.event_store.add_event('outage_report', data, source='nas')
+
+    def _heartbeat_fast_path(self, wsgi_app):
+        """Wrap the WSGI app so coalesced heartbeats are answered before Flask sees them."""
+        headers = [('Content-Type', 'application/json'), ('Content-Length', str(len(HEARTBEAT_OK_BODY)))]
+
+        def app(environ, start_response):
+            # Retry storm or misconfigured interval: acknowledge without routing,
+            # building a request context or recording the heartbeat
+            if (environ.get('PATH_INFO') == '/heartbeat' and environ.get('REQUEST_METHOD') == 'POST'
+                    and self.tracker.recently_seen()):
+                try:
+                    length = int(environ.get('CONTENT_LENGTH') or 0)
+                except ValueError:
+                    length = -1
+                if 0 <= length <= MAX_BODY_BYTES:
+                    # Consume the unread body, or it is left on the keep-alive
+                    # connection ahead of the client's next request
+                    environ['wsgi.input'].read(length)
+                    start_response('200 OK', headers)
+                    return [HEARTBEAT_OK_BODY]
+            return wsgi_app(environ, start_response)
+
+        return app
+
+    def _json_bytes(self, obj) -> bytes:
+        """Serialize a response body with the app's JSON provider, as bytes."""
+        if isinstance(self.app.json, OrjsonProvider):
+            return self.app.json.dumps_bytes(obj)
+        return self.app.json.dumps(obj).encode()
+
+    def _build_incidents(self, hours: int) -> bytes:
+        """Build the serialized incident list (outages + slow speed tests) for the dashboard."""
+        raw_incidents = []
+
+        # Collect outage incidents (down + restored, paired by SQLite)
+        for outage in self.event_store.get_outage_pairs(hours):
+            nas_rebooted = outage['nas_rebooted']
+            # Determine cause: power_cut if NAS rebooted, isp_issue if not, unknown if no data
+            if nas_rebooted is True:
+                cause = 'power_cut'
+            elif nas_rebooted is False:
+                cause = 'isp_issue'
+            else:
+                cause = 'unknown'
+            raw_incidents.append({
+                'type': 'outage',
+                'timestamp': outage['timestamp'],
+                'datetime': outage['datetime'],
+                'duration_seconds': outage['duration_seconds'],
+                'reason': outage['reason'],
+                'resolved_at': outage['resolved_at'],
+                'cause': cause,
+                'nas_rebooted': nas_rebooted,
+            })
+
+        # Collect slow speed test incidents (speed_mbps < 50)
+        speed_tests = self.event_store.get_events(event_type='speed_test', hours=hours, order='asc')
+
+        for i, st in enumerate(speed_tests):
+            speed = st['data'].get('speed_mbps')
+            if speed is None or speed >= 50:
+                continue
+            trigger = st['data'].get('trigger', '')
+            if trigger == 'slow_speed_retest':
+                continue
+
+            incident = {
+                'type': 'slow_speed',
+                'timestamp': st['timestamp'],
+                'datetime': st['datetime'],
+                'speed_mbps': speed,
+                'trigger': trigger,
+                'retest': None,
+            }
+
+            for j in range(i + 1, len(speed_tests)):
+                candidate = speed_tests[j]
+                dt = candidate['timestamp'] - st['timestamp']
+                if dt > 900:
+                    break
+                if candidate['data'].get('trigger') == 'slow_speed_retest':
+                    retest_speed = candidate['data'].get('speed_mbps', 0)
+                    incident['retest'] = {
+                        'speed_mbps': retest_speed,
+                        'passed': retest_speed >= 50,
+                        'timestamp': candidate['timestamp'],
+                    }
+                    break
+
+            raw_incidents.append(incident)
+
+        # Outages and slow tests each arrive in time order from SQLite; the
+        # sort just merges the two runs for grouping
+        raw_incidents.sort(key=lambda x: x['timestamp'])
+
+        # Group incidents within 30 min of each other into single events
+        MERGE_GAP = 1800  # 30 minutes
+        groups = []
+        for inc in raw_incidents:
+            inc_end = inc.get('resolved_at') or (inc.get('retest') or {}).get('timestamp')
+            if groups:
+                last = groups[-1]
+                last_end = last['resolved_at'] or last['sub_incidents'][-1]['timestamp']
+                if inc['timestamp'] - last_end <= MERGE_GAP:
+                    last['sub_incidents'].append(inc)
+                    # Update resolved_at to latest
+                    if inc_end and (last['resolved_at'] is None or inc_end > last['resolved_at']):
+                        last['resolved_at'] = inc_end
+                    continue
+            # Start new group
+            groups.append({
+                'resolved_at': inc_end,
+                'sub_incidents': [inc],
+            })
+
+        # Build final incident list from groups
+        incidents = []
+        for g in groups:
+            subs = g['sub_incidents']
+            outages, slows = [], []
+            total_downtime = 0
+            for s in subs:
+                if s['type'] == 'outage':
+                    outages.append(s)
+                    total_downtime += s.get('duration_seconds') or 0
+                else:
+                    slows.append(s)
+
+            if len(subs) == 1:
+                # Single incident, pass through as-is with resolved_at
+                entry = dict(subs[0])
+                if entry['type'] == 'slow_speed':
+                    retest = entry['retest']
+                    entry['resolved_at'] = retest['timestamp'] if retest and retest.get('passed') else None
+                incidents.append(entry)
+            else:
+                # Merged group
+                parts = []
+                if outages:
+                    parts.append(f"{len(outages)} outage{'s' if len(outages) != 1 else ''}")
+                if slows:
+                    parts.append(f"{len(slows)} slow test{'s' if len(slows) != 1 else ''}")
+                summary = ', '.join(parts)
+
+                if total_downtime > 3600:
+                    summary += f" — {total_downtime/3600:.1f}h total downtime"
+                elif total_downtime > 60:
+                    summary += f" — {total_downtime/60:.1f}m total downtime"
+                elif total_downtime > 0:
+                    summary += f" — {total_downtime:.0f}s total downtime"
+
+                # Determine cause for merged group (use last outage's cause)
+                group_cause = 'unknown'
+                for s in reversed(outages):
+                    cause = s['cause']
+                    if cause and cause != 'unknown':
+                        group_cause = cause
+                        break
+
+                incidents.append({
+                    'type': 'outage' if outages else 'slow_speed',
+                    'timestamp': subs[0]['timestamp'],
+                    'datetime': subs[0]['datetime'],
+                    'merged': True,
+                    'summary': summary,
+                    'resolved_at': g['resolved_at'],
+                    'sub_count': len(subs),
+                    'total_downtime_seconds': total_downtime,
+                    'cause': group_cause,
+                })
+
+        # Groups were built oldest first and never share a start time
+        incidents.reverse()
+
+        return self._json_bytes({
+            'incidents': incidents,
+            'count': len(incidents),
+            'hours': hours,
+        })
+
 
     def _setup_routes(self):
         """Setup Flask routes."""
 
+        # What every heartbeat touches is bound as default arguments, read as
+        # locals instead of attribute lookups on self
         @self.app.route('/heartbeat', methods=['POST'])
-        def heartbeat():
+        def heartbeat(_tracker=self.tracker, _record_remote_addr=self.config.record_remote_addr,
+                      _time=time.time):
             """Receive heartbeat from NAS."""
             try:
-                data = request.get_json() or {}
-                data['received_at'] = time.time()
-                data['remote_addr'] = request.remote_addr
+                data = _request_data()
+                now = _time()
+                data['received_at'] = now
+                if _record_remote_addr:
+                    data['remote_addr'] = request.environ.get('REMOTE_ADDR')
 
-                result = self.tracker.record_heartbeat(data)
+                result = _tracker.record_heartbeat(data)
 
                 if result.get('event') == 'restored':
                     duration = result['duration_seconds']
@@ -931,18 +1927,22 @@ class VPSMonitor:
                         'nas_rebooted': nas_rebooted,
                     })
                     self.event_store.add_event('restored', {
-                        'timestamp': time.time(),
-                        'datetime_str': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'timestamp': now,
+                        'datetime_str': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
                         'duration_seconds': duration,
                         'nas_rebooted': nas_rebooted,
                         'boot_id': result.get('boot_id', ''),
                         'uptime_seconds': result.get('uptime_seconds', 0),
                     }, source='vps')
-                else:
-                    logger.debug(f"Heartbeat received from {request.remote_addr}")
+                elif logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Heartbeat received from %s", request.environ.get('REMOTE_ADDR'))
 
+                if result.get('event') == 'heartbeat':
+                    return Response(HEARTBEAT_OK_BODY, mimetype='application/json')
                 return jsonify({'status': 'ok', 'result': result})
 
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error processing heartbeat: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -951,36 +1951,45 @@ class VPSMonitor:
         def outage_report():
             """Receive outage report from NAS."""
             try:
-                data = request.get_json() or {}
-                data['received_at'] = time.time()
-                data['remote_addr'] = request.remote_addr
-
-                logger.info(f"Outage report received: {data}")
-                self.outage_logger.log_outage({
-                    'type': 'nas_report',
-                    'data': data
-                })
-                self.event_store.add_event('outage_report', data, source='nas')
-
+                self._record_outage_report(_request_data())
                 return jsonify({'status': 'ok'})
 
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error processing outage report: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
 
+        @self.app.route('/outage/batch', methods=['POST'])
+        def outage_batch():
+            """Receive several outage reports from NAS in one request."""
+            try:
+                outages = _request_data(MAX_BATCH_BODY_BYTES).get('outages', [])
+                for data in outages:
+                    self._record_outage_report(data)
+                return jsonify({'status': 'ok', 'count': len(outages)})
+
+            except HTTPException:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing outage batch: {e}")
+                return jsonify({'status': 'error', 'message': str(e)}), 500
+
         @self.app.route('/api/events', methods=['POST'])
         def receive_events():
             """Receive events from NAS (speed tests, latency, etc)."""
             try:
-                data = request.get_json() or {}
+                data = _request_data()
                 event_type = data.get('event_type', 'unknown')
                 event_data = data.get('data', {})
                 event_data['received_at'] = time.time()
 
                 self.event_store.add_event(event_type, event_data, source='nas')
-                logger.debug(f"Event received from NAS: {event_type}")
+                logger.debug("Event received from NAS: %s", event_type)
 
                 return jsonify({'status': 'ok'})
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"Error receiving event: {e}")
                 return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -990,216 +1999,62 @@ class VPSMonitor:
             """Get event history for dashboard."""
             hours = request.args.get('hours', 168, type=int)  # 7 days default
             event_type = request.args.get('type', None)
+            order = request.args.get('order', 'desc')
+            limit = max(1, min(request.args.get('limit', 1000, type=int), 1000))
 
-            if event_type:
-                events = self.event_store.get_events(event_type=event_type, hours=hours)
-            else:
-                events = self.event_store.get_events(hours=hours)
+            events = self.event_store.get_events_json(event_type=event_type, hours=hours, limit=limit, order=order)
 
-            return jsonify({
-                'events': events,
-                'count': len(events),
-                'hours': hours
-            })
+            # The stored event JSON is spliced in as-is rather than decoded and re-encoded
+            return Response(
+                f'{{"events":[{",".join(events)}],"count":{len(events)},"hours":{hours}}}\n',
+                mimetype='application/json'
+            )
+
+        @self.app.route('/api/history_aggregated', methods=['GET'])
+        def get_history_aggregated():
+            """Get per-bucket chart averages for long time ranges."""
+            hours = request.args.get('hours', 168, type=int)
+            bucket = max(request.args.get('bucket', 3600, type=int), 60)
+
+            key = ('history_aggregated', hours, bucket, self.event_store.generation)
+            cached = self._response_cache.get(key)
+            if cached is None:
+                buckets = self.event_store.get_history_buckets(hours=hours, bucket_seconds=bucket)
+                cached = self._response_cache.put(key, self._json_bytes({
+                    'buckets': buckets,
+                    'count': len(buckets),
+                    'hours': hours,
+                    'bucket': bucket,
+                }))
+            return Response(cached[0], mimetype='application/json')
 
         @self.app.route('/api/summary', methods=['GET'])
         def get_summary():
             """Get summary data for dashboard."""
             hours = request.args.get('hours', 24, type=int)
 
-            speed_tests = self.event_store.get_speed_tests(hours=hours)
-            outages = self.event_store.get_outages(hours=hours)
-            latency_events = self.event_store.get_latency_events(hours=hours)
-            status = self.tracker.get_status()
-
-            # Calculate stats
-            speeds = [e['data'].get('speed_mbps') for e in speed_tests if e['data'].get('speed_mbps')]
-            avg_speed = sum(speeds) / len(speeds) if speeds else None
-            min_speed = min(speeds) if speeds else None
-            max_speed = max(speeds) if speeds else None
-
-            outage_count = len([e for e in outages if e['event_type'] in ('outage_start', 'down')])
-            total_downtime = sum(
-                e['data'].get('duration_seconds', 0)
-                for e in outages
-                if e['event_type'] in ('outage_end', 'restored', 'outage_report')
-            )
-
-            return jsonify({
-                'status': status,
-                'speed_stats': {
-                    'average': round(avg_speed, 1) if avg_speed else None,
-                    'min': round(min_speed, 1) if min_speed else None,
-                    'max': round(max_speed, 1) if max_speed else None,
-                    'test_count': len(speed_tests)
-                },
-                'outage_stats': {
-                    'count': outage_count,
-                    'total_downtime_seconds': total_downtime
-                },
-                'latency_events': len(latency_events),
-                'hours': hours
-            })
+            # The event totals are cached; the live status is spliced in front of them
+            key = ('summary', hours, self.event_store.generation)
+            cached = self._response_cache.get(key)
+            if cached is None:
+                stats = self.event_store.get_summary_stats(hours=hours)
+                stats['hours'] = hours
+                cached = self._response_cache.put(key, self._json_bytes(stats))
+            status = self._json_bytes(self.tracker.get_status())
+            return Response(b''.join((b'{"status":', status, b',', cached[0][1:])),
+                            mimetype='application/json')
 
         @self.app.route('/api/incidents', methods=['GET'])
         def get_incidents():
             """Get incident list (outages + slow speed tests) for dashboard."""
             hours = request.args.get('hours', 24, type=int)
-            events = self.event_store.get_events(hours=hours)
-
-            raw_incidents = []
-
-            # Collect outage incidents (pair down + restored)
-            down_events = [e for e in events if e['event_type'] in ('down', 'outage_start')]
-            restored_events = [e for e in events if e['event_type'] in ('restored', 'outage_end')]
-            restored_events.sort(key=lambda x: x['timestamp'])
-
-            for de in down_events:
-                restored = None
-                for re in restored_events:
-                    if re['timestamp'] > de['timestamp']:
-                        restored = re
-                        break
-                duration = restored['data'].get('duration_seconds', 0) if restored else None
-                resolved_at = restored['timestamp'] if restored else None
-                nas_rebooted = restored['data'].get('nas_rebooted') if restored else None
-                # Determine cause: power_cut if NAS rebooted, isp_issue if not, unknown if no data
-                if nas_rebooted is True:
-                    cause = 'power_cut'
-                elif nas_rebooted is False:
-                    cause = 'isp_issue'
-                else:
-                    cause = 'unknown'
-                raw_incidents.append({
-                    'type': 'outage',
-                    'timestamp': de['timestamp'],
-                    'datetime': de['datetime'],
-                    'duration_seconds': duration,
-                    'reason': de['data'].get('reason', 'Connection lost'),
-                    'resolved_at': resolved_at,
-                    'cause': cause,
-                    'nas_rebooted': nas_rebooted,
-                })
-
-            # Collect slow speed test incidents (speed_mbps < 50)
-            speed_tests = [e for e in events if e['event_type'] == 'speed_test']
-            speed_tests.sort(key=lambda x: x['timestamp'])
-
-            for i, st in enumerate(speed_tests):
-                speed = st['data'].get('speed_mbps')
-                if speed is None or speed >= 50:
-                    continue
-                trigger = st['data'].get('trigger', '')
-                if trigger == 'slow_speed_retest':
-                    continue
-
-                incident = {
-                    'type': 'slow_speed',
-                    'timestamp': st['timestamp'],
-                    'datetime': st['datetime'],
-                    'speed_mbps': speed,
-                    'trigger': trigger,
-                    'retest': None,
-                }
-
-                for j in range(i + 1, len(speed_tests)):
-                    candidate = speed_tests[j]
-                    dt = candidate['timestamp'] - st['timestamp']
-                    if dt > 900:
-                        break
-                    if candidate['data'].get('trigger') == 'slow_speed_retest':
-                        retest_speed = candidate['data'].get('speed_mbps', 0)
-                        incident['retest'] = {
-                            'speed_mbps': retest_speed,
-                            'passed': retest_speed >= 50,
-                            'timestamp': candidate['timestamp'],
-                        }
-                        break
-
-                raw_incidents.append(incident)
-
-            # Sort chronologically for grouping
-            raw_incidents.sort(key=lambda x: x['timestamp'])
-
-            # Group incidents within 30 min of each other into single events
-            MERGE_GAP = 1800  # 30 minutes
-            groups = []
-            for inc in raw_incidents:
-                if groups:
-                    last = groups[-1]
-                    last_end = last['resolved_at'] or last['sub_incidents'][-1]['timestamp']
-                    if inc['timestamp'] - last_end <= MERGE_GAP:
-                        last['sub_incidents'].append(inc)
-                        # Update resolved_at to latest
-                        inc_end = inc.get('resolved_at') or (inc.get('retest', {}) or {}).get('timestamp')
-                        if inc_end and (last['resolved_at'] is None or inc_end > last['resolved_at']):
-                            last['resolved_at'] = inc_end
-                        continue
-                # Start new group
-                resolved = inc.get('resolved_at') or (inc.get('retest', {}) or {}).get('timestamp')
-                groups.append({
-                    'resolved_at': resolved,
-                    'sub_incidents': [inc],
-                })
-
-            # Build final incident list from groups
-            incidents = []
-            for g in groups:
-                subs = g['sub_incidents']
-                outages = [s for s in subs if s['type'] == 'outage']
-                slows = [s for s in subs if s['type'] == 'slow_speed']
-                total_downtime = sum(s.get('duration_seconds') or 0 for s in outages)
-
-                if len(subs) == 1:
-                    # Single incident, pass through as-is with resolved_at
-                    entry = dict(subs[0])
-                    if entry['type'] == 'slow_speed' and entry.get('retest') and entry['retest'].get('passed'):
-                        entry['resolved_at'] = entry['retest']['timestamp']
-                    elif entry['type'] == 'slow_speed':
-                        entry['resolved_at'] = None
-                    incidents.append(entry)
-                else:
-                    # Merged group
-                    parts = []
-                    if outages:
-                        parts.append(f"{len(outages)} outage{'s' if len(outages) != 1 else ''}")
-                    if slows:
-                        parts.append(f"{len(slows)} slow test{'s' if len(slows) != 1 else ''}")
-                    summary = ', '.join(parts)
-
-                    if total_downtime > 3600:
-                        summary += f" — {total_downtime/3600:.1f}h total downtime"
-                    elif total_downtime > 60:
-                        summary += f" — {total_downtime/60:.1f}m total downtime"
-                    elif total_downtime > 0:
-                        summary += f" — {total_downtime:.0f}s total downtime"
-
-                    # Determine cause for merged group (use last outage's cause)
-                    group_cause = 'unknown'
-                    for s in reversed(outages):
-                        if s.get('cause') and s['cause'] != 'unknown':
-                            group_cause = s['cause']
-                            break
-
-                    incidents.append({
-                        'type': 'outage' if outages else 'slow_speed',
-                        'timestamp': subs[0]['timestamp'],
-                        'datetime': subs[0]['datetime'],
-                        'merged': True,
-                        'summary': summary,
-                        'resolved_at': g['resolved_at'],
-                        'sub_count': len(subs),
-                        'total_downtime_seconds': total_downtime,
-                        'cause': group_cause,
-                    })
-
-            incidents.sort(key=lambda x: x['timestamp'], reverse=True)
-
-            return jsonify({
-                'incidents': incidents,
-                'count': len(incidents),
-                'hours': hours,
-            })
+            key = ('incidents', hours, self.event_store.generation)
+            cached = self._response_cache.get(key)
+            if cached is None:
+                cached = self._response_cache.put(key, self._build_incidents(hours))
+            response = Response(cached[0], mimetype='application/json')
+            response.set_etag(cached[1])
+            return response.make_conditional(request)
 
         @self.app.route('/status', methods=['GET'])
         def status():
@@ -1215,7 +2070,10 @@ class VPSMonitor:
         @self.app.route('/dashboard', methods=['GET'])
         def dashboard():
             """Serve the dashboard HTML."""
-            return Response(DASHBOARD_HTML, mimetype='text/html')
+            response = Response(DASHBOARD_HTML_BYTES, mimetype='text/html')
+            response.set_etag(DASHBOARD_ETAG)
+            response.headers['Cache-Control'] = 'public, max-age=300'
+            return response.make_conditional(request)
 
         @self.app.route('/speedtest', methods=['GET'])
         def speedtest():
@@ -1232,8 +2090,6 @@ class VPSMonitor:
         @self.app.route('/trigger-speedtest', methods=['POST'])
         def trigger_speedtest():
             """Trigger a speed test on the NAS."""
-            import urllib.request
-            import urllib.error
             nas_url = "http://100.66.41.139:8090"
             test_type = request.args.get('type', 'ookla')  # ookla, vps, or full
             
@@ -1245,39 +2101,36 @@ class VPSMonitor:
                 else:
                     endpoint = f"{nas_url}/speedtest"
                 
-                req = urllib.request.Request(endpoint, method='GET')
-                with urllib.request.urlopen(req, timeout=120) as resp:
-                    data = resp.read()
-                    return Response(data, mimetype='application/json')
-            except urllib.error.URLError as e:
+                if not self._speedtest_lock.acquire(blocking=False):
+                    return jsonify({'error': 'A speed test is already running'}), 409
+                try:
+                    # Fail fast if the NAS is unreachable; the test itself may take minutes
+                    resp = self._nas_session.get(endpoint, timeout=(5, 120))
+                    resp.raise_for_status()
+                    return Response(resp.content, mimetype='application/json')
+                finally:
+                    self._speedtest_lock.release()
+            except requests.RequestException as e:
                 return jsonify({'error': f'Failed to reach NAS: {str(e)}'}), 502
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
 
-    def _check_loop(self):
-        """Background loop to check for missed heartbeats."""
-        while self.running:
-            try:
-                result = self.tracker.check_status()
-                if result:
-                    if result.get('event') == 'down':
-                        reason = result.get('reason', 'unknown')
-                        logger.warning(f"Home network DOWN: {reason}")
-                        self.notifier.notify_down(reason)
-                        self.outage_logger.log_outage({
-                            'type': 'down_detected',
-                            'reason': reason
-                        })
-                        self.event_store.add_event('down', {
-                            'timestamp': time.time(),
-                            'datetime_str': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                            'reason': reason
-                        }, source='vps')
-            except Exception as e:
-                logger.error(f"Error in check loop: {e}")
-
-            time.sleep(self.config.check_interval_seconds)
+    def _handle_down(self, result: dict):
+        """Notify and record that the NAS has stopped sending heartbeats."""
+        reason = result.get('reason', 'unknown')
+        logger.warning(f"Home network DOWN: {reason}")
+        self.notifier.notify_down(reason)
+        self.outage_logger.log_outage({
+            'type': 'down_detected',
+            'reason': reason
+        })
+        now = time.time()
+        self.event_store.add_event('down', {
+            'timestamp': now,
+            'datetime_str': datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S'),
+            'reason': reason
+        }, source='vps')
 
     def run(self):
         """Run the VPS monitor."""
@@ -1289,22 +2142,67 @@ class VPSMonitor:
         logger.info(f"ntfy topic: {self.config.ntfy_topic or '(not configured)'}")
         logger.info(f"Startup grace period: {self.config.startup_grace_seconds}s")
 
-        # Start background check thread
-        self._check_thread = threading.Thread(target=self._check_loop, daemon=True)
-        self._check_thread.start()
-
-        # Run Flask app
-        # Using threaded=True for handling concurrent requests
-        self.app.run(
-            host=self.config.listen_host,
-            port=self.config.listen_port,
-            threaded=True,
-            use_reloader=False  # Disable reloader for production
-        )
+        if GUNICORN_AVAILABLE:
+            self._serve_gunicorn()
+        elif waitress is not None:
+            # gunicorn doesn't run on Windows; waitress is a thread-pool server that does
+            logger.info("gunicorn not installed, serving with waitress")
+            self._start_worker()
+            waitress.serve(
+                self.app,
+                host=self.config.listen_host,
+                port=self.config.listen_port,
+                threads=4,
+                channel_timeout=30,
+                connection_limit=200,
+            )
+        else:
+            logger.warning("gunicorn not installed, falling back to the Flask development server")
+            self._start_worker()
+            self.app.run(
+                host=self.config.listen_host,
+                port=self.config.listen_port,
+                threaded=True,
+                use_reloader=False  # Disable reloader for production
+            )
+
+    def _start_worker(self):
+        """Start the per-process pieces: ntfy sender, log and event writers and heartbeat watchdog."""
+        self.notifier.start()
+        self.outage_logger.start()
+        self.event_store.start()
+        self.tracker.start()
+
+    def _serve_gunicorn(self):
+        """Serve the Flask app from an embedded gunicorn server."""
+        monitor = self
+
+        class GunicornApp(BaseApplication):
+            def load_config(self):
+                self.cfg.set('bind', f"{monitor.config.listen_host}:{monitor.config.listen_port}")
+                # Heartbeat state lives in process memory, so exactly one worker
+                # serves requests, runs the heartbeat watchdog and holds the ntfy connection
+                self.cfg.set('workers', 1)
+                self.cfg.set('worker_class', 'gthread')
+                self.cfg.set('threads', 4)
+                self.cfg.set('keepalive', 75)
+                self.cfg.set('timeout', 30)
+                self.cfg.set('post_worker_init', lambda worker: monitor._start_worker())
+                # Flush the queued notifications, log lines and events on the way out
+                self.cfg.set('worker_exit', lambda server, worker: monitor.stop())
+
+            def load(self):
+                return monitor.app
+
+        GunicornApp().run()
 
     def stop(self):
         """Stop the monitor."""
         self.running = False
+        self.tracker.stop()
+        self.notifier.close()
+        self.outage_logger.close()
+        self.event_store.close()
 
 
 def main():